@@ -0,0 +1,73 @@
+"""
+Bundle versionné des artefacts d'un refresh (niveaux, métadonnées, Pine Script)
+Nom adressé par contenu, variantes pré-compressées gzip/brotli et petit manifest
+pour que les clients ne fassent qu'une requête conditionnelle
+"""
+import os
+import gzip
+import json
+import hashlib
+import brotli
+
+from config import BUNDLE_DIR, BUNDLE_KEEP
+from output_writers import atomic_write
+
+
+def build_bundle(level_sets, pine_script):
+    """JSON canonique du bundle (sans horodatage de génération : le hash ne dépend que du contenu)"""
+    payload = {
+        'levels': {
+            key: {'metadata': metadata, 'levels': df_levels.to_dict(orient='records')}
+            for key, (df_levels, metadata) in sorted(level_sets.items())
+        },
+        'pine': pine_script
+    }
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=float).encode('utf-8')
+
+
+def prune_bundles(bundle_dir, keep_names):
+    for name in os.listdir(bundle_dir):
+        if name.startswith('gex-') and name.split('.')[0] not in keep_names:
+            os.remove(os.path.join(bundle_dir, name))
+
+
+def publish_bundle(level_sets, pine_script, generated_at, bundle_dir=BUNDLE_DIR):
+    """Écrit gex-<hash>.json(.gz/.br) puis le manifest ; retourne le manifest"""
+    body = build_bundle(level_sets, pine_script)
+    version = hashlib.sha256(body).hexdigest()[:16]
+    name = f"gex-{version}"
+    manifest_path = os.path.join(bundle_dir, 'manifest.json')
+
+    previous = {}
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+
+    files = {'json': f"{name}.json", 'gzip': f"{name}.json.gz", 'br': f"{name}.json.br"}
+    sizes = {'json': len(body)}
+    if previous.get('version') != version or not all(os.path.exists(os.path.join(bundle_dir, f)) for f in files.values()):
+        atomic_write(os.path.join(bundle_dir, files['json']), body)
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        atomic_write(os.path.join(bundle_dir, files['gzip']), compressed)
+        sizes['gzip'] = len(compressed)
+        compressed = brotli.compress(body, quality=11)
+        atomic_write(os.path.join(bundle_dir, files['br']), compressed)
+        sizes['br'] = len(compressed)
+    else:
+        files = previous['files']
+        sizes = previous['sizes']
+
+    history = [version] + [v for v in previous.get('history', []) if v != version]
+    manifest = {
+        'version': version,
+        'generated_at': generated_at,
+        'files': files,
+        'sizes': sizes,
+        'history': history[:BUNDLE_KEEP]
+    }
+    atomic_write(manifest_path, json.dumps(manifest, indent=2))
+    prune_bundles(bundle_dir, {f"gex-{v}" for v in manifest['history']})
+    return manifest
@@ -6,7 +6,8 @@ load_dotenv()
 
 # API Configuration
 API_KEY = os.getenv('GEXBOT_API_KEY')
-BASE_URL = "https://api.gexbot.com"
+UPSTREAM_URL = "https://api.gexbot.com"
+BASE_URL = os.getenv('GEXBOT_BASE_URL', UPSTREAM_URL)
 
 # Tickers et ratios de conversion
 TICKERS = {
@@ -33,3 +34,104 @@ OUTPUT_FILES = {
 TOP_STRIKES_COUNT = 15
 API_TIMEOUT = 15
 DEFAULT_AGGREGATION = 'full'
+
+# Historique local (état persistant entre les runs)
+STATE_DIR = 'state'
+
+# Vol triggers calculés localement (fenêtre -> secondes)
+VOL_TRIGGER_WINDOWS = {
+    '1min': 60,
+    '5min': 300,
+    '10min': 600,
+    '15min': 900,
+    '30min': 1800,
+    '1h': 3600
+}
+RING_BUFFER_CAPACITY = 240
+RING_BUFFER_MAX_STRIKES = 512
+# Écart max (fraction de la fenêtre) entre le snapshot de référence et t - fenêtre
+RING_BUFFER_WINDOW_TOLERANCE = 0.5
+
+# Historique compact des chaînes (keyframe + deltas)
+HISTORY_DIR = 'history'
+SNAPSHOT_KEYFRAME_INTERVAL = 60
+SNAPSHOT_GEX_QUANTUM = 1.0
+LEVEL_HISTORY_DIR = os.path.join(HISTORY_DIR, 'levels')
+# Jours remontés par LevelHistory.at() avant le premier snapshot du jour (week-end, jours fériés)
+LEVEL_HISTORY_LOOKBACK_DAYS = 7
+
+# Agrégats matérialisés (régime gamma, murs, net GEX) par granularité, en secondes
+ROLLUP_DIR = os.path.join(HISTORY_DIR, 'rollups')
+ROLLUP_GRANULARITIES = {'5min': 300, '1h': 3600, '1d': 86400}
+# Un fichier par partition (jour, mois, année) : réécriture atomique bornée
+ROLLUP_PARTITIONS = {'5min': '%Y%m%d', '1h': '%Y%m', '1d': '%Y'}
+ROLLUP_MAX_GAP = 900
+
+# Table de niveaux partagée (mmap) pour les consommateurs locaux
+LIVE_TABLE_PATH = os.path.join(STATE_DIR, 'live_levels.bin')
+LIVE_TABLE_MAX_LEVELS = 64
+
+# Score de persistance des niveaux
+PERSISTENCE_STATE_FILE = os.path.join(STATE_DIR, 'persistence.json')
+PERSISTENCE_EWMA_ALPHA = 0.2
+PERSISTENCE_FULL_AGE = 7200
+PERSISTENCE_MAX_MISSES = 5
+PERSISTENCE_MAX_ENTRIES = 500
+# Un niveau est "top" quand son strike fait partie des N plus forts |GEX| du set
+PERSISTENCE_TOP_N = 5
+PERSISTENCE_WEIGHTS = {'age': 0.5, 'top': 0.25, 'strength': 0.25}
+
+# Étape de sortie
+PINE_OUTPUT_FILE = os.path.join('indicator', 'gex-levels.pine')
+JSON_OUTPUT_FILE = 'gex_levels.json'
+TIMESTAMP_OUTPUT_FILE = 'last_update.txt'
+RUN_MANIFEST_FILE = 'run_manifest.json'
+OUTPUT_WORKERS = 4
+
+# Quota API GexBot et priorité des séries
+API_QUOTA_PER_MINUTE = 60
+API_BURST = 12
+DTE_PRIORITY = ['zero', 'one', 'full']
+
+# Analytique locale (profil gamma)
+GAMMA_PROFILE_POINTS = 40
+
+# Heatmap strike × temps (une par session)
+HEATMAP_DIR = os.path.join(HISTORY_DIR, 'heatmap')
+HEATMAP_CAPACITY = 1440
+HEATMAP_RANGE_PCT = 5
+HEATMAP_DTYPE = 'float32'
+
+# Budget du Pine Script généré (limites TradingView)
+PINE_BUDGET = {
+    'max_lines': 500,
+    'max_labels': 500,
+    'max_string_bytes': 8000,
+    'max_script_bytes': 60000
+}
+PINE_PROXIMITY_WEIGHT = 2.0
+PINE_PROXIMITY_RANGE_PCT = 2.0
+
+# Proxy local avec cache (GEXBOT_BASE_URL=http://127.0.0.1:8787 pour l'utiliser)
+PROXY_HOST = '127.0.0.1'
+PROXY_PORT = 8787
+PROXY_PUBLISH_INTERVAL = 60
+PROXY_MIN_TTL = 5
+PROXY_MAX_TTL = 300
+
+# Bundle d'artefacts pour le frontend (servi statiquement par Vercel)
+BUNDLE_DIR = os.path.join('frontend', 'public', 'bundle')
+BUNDLE_KEEP = 3
+
+# Cadence de rafraîchissement adaptative (mode --watch)
+REFRESH_STATE_FILE = os.path.join(STATE_DIR, 'refresh_schedule.json')
+REFRESH_DEFAULT_INTERVALS = {'zero': 60, 'one': 120, 'full': 300}
+REFRESH_MIN_INTERVAL = 15
+REFRESH_MAX_INTERVAL = 900
+REFRESH_CADENCE_ALPHA = 0.3
+REFRESH_PUBLISH_LAG = 5
+# Polls à REFRESH_MIN_INTERVAL quand le timestamp n'a pas bougé, avant le backoff exponentiel
+REFRESH_SHORT_RETRIES = 3
+
+# Cache des derniers niveaux calculés (runs partiels --tickers/--dte)
+LEVEL_CACHE_DIR = os.path.join(STATE_DIR, 'levels')
@@ -12,6 +12,9 @@ const BASE_URL = import.meta.env.DEV
 
 const API_TIMEOUT = 10000;
 
+// Bundle pré-calculé par update_gex.py (niveaux + métadonnées + Pine Script)
+const BUNDLE_URL = "/bundle";
+
 // Configuration des tickers
 const TICKERS = {
   SPX: {
@@ -45,6 +48,34 @@ function App() {
   const [pineCode, setPineCode] = useState("");
   const [lastUpdate, setLastUpdate] = useState("");
   const featuresRef = useRef(null);
+  const bundleVersionRef = useRef(null);
+
+  // Une requête conditionnelle sur le manifest, puis le bundle immuable si la version a changé
+  const fetchBundle = async () => {
+    try {
+      const manifestResponse = await fetch(`${BUNDLE_URL}/manifest.json`, {
+        cache: "no-cache",
+      });
+      if (!manifestResponse.ok) return null;
+      const manifest = await manifestResponse.json();
+      if (manifest.version === bundleVersionRef.current) {
+        return { unchanged: true };
+      }
+
+      // En prod, variante pré-compressée servie avec Content-Encoding (vercel.json) ; le serveur Vite de dev sert les fichiers bruts
+      const bundleFile = import.meta.env.DEV
+        ? manifest.files.json
+        : manifest.files.br || manifest.files.gzip || manifest.files.json;
+      const bundleResponse = await fetch(`${BUNDLE_URL}/${bundleFile}`);
+      if (!bundleResponse.ok) return null;
+      const bundle = await bundleResponse.json();
+      bundleVersionRef.current = manifest.version;
+      return { manifest, bundle };
+    } catch (err) {
+      console.warn("⚠️ Bundle indisponible, calcul local:", err);
+      return null;
+    }
+  };
 
   // Fetch GEX data from API
   const fetchGexData = async (ticker, aggregation) => {
@@ -1039,9 +1070,41 @@ plot(close, title="Price", display=display.none)
       setLoading(true);
       setError(null);
 
-      console.log("🚀 Fetching GEX data from API...");
-
       try {
+        const bundleResult = await fetchBundle();
+        if (bundleResult?.unchanged) {
+          setLoading(false);
+          return;
+        }
+        if (bundleResult) {
+          const { manifest, bundle } = bundleResult;
+          const displayData = {
+            es: { zero: [], one: [], full: [] },
+            nq: { zero: [], one: [], full: [] },
+            qqq: { zero: [], one: [], full: [] },
+          };
+          for (const [key, entry] of Object.entries(bundle.levels)) {
+            const [target, dteKey] = key.split("_");
+            if (displayData[target]) displayData[target][dteKey] = entry.levels;
+          }
+          setPineCode(bundle.pine);
+          setGexData(displayData);
+          setLastUpdate(
+            new Date(
+              manifest.generated_at.replace(" UTC", "Z").replace(" ", "T")
+            ).toLocaleString("fr-FR", {
+              dateStyle: "long",
+              timeStyle: "short",
+              timeZone: "Europe/Paris",
+            })
+          );
+          console.log(`✅ Bundle ${manifest.version} chargé`);
+          setLoading(false);
+          return;
+        }
+
+        console.log("🚀 Fetching GEX data from API...");
+
         const csvDataDict = {};
         const metadataDict = {};
         const displayData = {
@@ -0,0 +1,79 @@
+"""
+Analytique vectorisée sur la courbe de strikes
+Courbe de GEX net cumulé, zero gamma local par interpolation, max pain et profil gamma sous-échantillonné
+"""
+import numpy as np
+
+from config import GAMMA_PROFILE_POINTS
+
+
+def strike_arrays(strikes):
+    """(strikes, GEX net vol+oi) triés par strike, lignes invalides ignorées"""
+    rows = [s[:3] for s in strikes if isinstance(s, list) and len(s) >= 3]
+    if not rows:
+        return np.zeros(0), np.zeros(0)
+    data = np.asarray(rows, dtype=np.float64)
+    order = np.argsort(data[:, 0], kind='stable')
+    return data[order, 0], data[order, 1] + data[order, 2]
+
+
+def zero_crossings(strike_values, curve):
+    """Strikes interpolés linéairement où la courbe change de signe"""
+    if len(curve) < 2:
+        return np.zeros(0)
+    left, right = curve[:-1], curve[1:]
+    idx = np.nonzero(np.signbit(left) != np.signbit(right))[0]
+    idx = idx[right[idx] != left[idx]]
+    k0, k1 = strike_values[idx], strike_values[idx + 1]
+    return k0 + (k1 - k0) * (-left[idx]) / (right[idx] - left[idx])
+
+
+def max_pain(strike_values, net_gex):
+    """Strike au GEX total minimal en valeur absolue (premier en cas d'égalité)"""
+    if not len(net_gex):
+        return None
+    return float(strike_values[np.argmin(np.abs(net_gex))])
+
+
+def gamma_profile(strike_values, net_gex, points=GAMMA_PROFILE_POINTS):
+    """GEX net regroupé en `points` tranches de strikes égales : [[centre, gex], ...]"""
+    if not len(strike_values):
+        return []
+    lo, hi = strike_values[0], strike_values[-1]
+    if hi <= lo:
+        return [[round(float(lo), 2), round(float(net_gex.sum()), 2)]]
+    n = min(points, len(strike_values))
+    edges = np.linspace(lo, hi, n + 1)
+    sums, _ = np.histogram(strike_values, bins=edges, weights=net_gex)
+    centers = (edges[:-1] + edges[1:]) / 2
+    return [[round(float(k), 2), round(float(g), 2)] for k, g in zip(centers, sums)]
+
+
+def gamma_regime(spot, volatility_trigger):
+    """
+    Convention du projet : spot au-dessus du vol trigger = gamma négatif (volatilité amplifiée),
+    au niveau ou en dessous = gamma positif. Retourne -1, +1, ou 0 si l'un des deux est inconnu.
+    """
+    if not spot or not volatility_trigger:
+        return 0
+    return -1 if spot > volatility_trigger else 1
+
+
+def regime_label(regime):
+    return {1: "Positive Gamma", -1: "Negative Gamma"}.get(regime, "Unknown Gamma")
+
+
+def analyze_strikes(strikes, spot):
+    """Tout le calcul en une passe numpy : zero gamma local, crossings, max pain, profil"""
+    strike_values, net_gex = strike_arrays(strikes)
+    cumulative = np.cumsum(net_gex)
+    crossings = zero_crossings(strike_values, cumulative)
+    zero_gamma = None
+    if len(crossings):
+        zero_gamma = float(crossings[np.argmin(np.abs(crossings - spot))])
+    return {
+        'zero_gamma': zero_gamma,
+        'zero_crossings': [round(float(k), 2) for k in crossings],
+        'max_pain': max_pain(strike_values, net_gex),
+        'gamma_profile': gamma_profile(strike_values, net_gex)
+    }
@@ -0,0 +1,117 @@
+"""
+Heatmap strike × temps du GEX net, une par ticker/agrégation et par session
+Fichier binaire mmap : petit header + timestamps + matrice [lignes, strikes] en float16/float32
+sur une grille de strikes fixée à la création. La lecture d'une session est une simple tranche.
+Les valeurs sont stockées divisées par le facteur d'échelle de l'en-tête : le GEX par strike (~1e5)
+dépasse le maximum du float16 (65504), d'où un facteur 1000 pour ce format.
+"""
+import os
+import struct
+import numpy as np
+
+from config import HEATMAP_CAPACITY, HEATMAP_RANGE_PCT, HEATMAP_DTYPE
+
+
+MAGIC = b'GEXH'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIIdd')
+SCALE = struct.Struct('<d')
+HEADER_SIZE = 64
+ROWS_OFFSET = struct.calcsize('<4sHHII')
+
+DTYPE_CODES = {'float16': 2, 'float32': 4}
+CODE_DTYPES = {2: np.float16, 4: np.float32}
+DTYPE_SCALES = {'float16': 1000.0, 'float32': 1.0}
+
+
+def strike_step(strike_values):
+    diffs = np.diff(np.unique(strike_values))
+    diffs = diffs[diffs > 0]
+    return float(np.median(diffs)) if len(diffs) else 1.0
+
+
+class GexHeatmap:
+    def __init__(self, path, mode='r'):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, dtype_code, n_strikes, capacity, _, strike_min, step = HEADER.unpack(f.read(HEADER.size))
+            # Version 1 : pas de facteur d'échelle (valeurs brutes)
+            self.scale = SCALE.unpack(f.read(SCALE.size))[0] if version >= 2 else 1.0
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError(f"{path}: format de heatmap inconnu")
+        self.dtype = CODE_DTYPES[dtype_code]
+        self.n_strikes = n_strikes
+        self.capacity = capacity
+        self.strike_min = strike_min
+        self.step = step
+        self.strikes = strike_min + step * np.arange(n_strikes)
+        mm_mode = 'r+' if mode == 'w' else 'r'
+        self._times = np.memmap(path, dtype=np.float64, mode=mm_mode, offset=HEADER_SIZE, shape=(capacity,))
+        self._matrix = np.memmap(path, dtype=self.dtype, mode=mm_mode, offset=HEADER_SIZE + 8 * capacity,
+                                 shape=(capacity, n_strikes))
+
+    @classmethod
+    def create(cls, path, strike_values, spot, capacity=HEATMAP_CAPACITY, dtype=HEATMAP_DTYPE):
+        """Fixe la grille (pas médian des strikes, spot ± HEATMAP_RANGE_PCT) et alloue le fichier"""
+        step = strike_step(strike_values)
+        half_range = spot * HEATMAP_RANGE_PCT / 100
+        strike_min = np.floor((spot - half_range) / step) * step
+        n_strikes = int(np.ceil(2 * half_range / step)) + 1
+        itemsize = np.dtype(dtype).itemsize
+        size = HEADER_SIZE + 8 * capacity + itemsize * capacity * n_strikes
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, DTYPE_CODES[dtype], n_strikes, capacity, 0, strike_min, step))
+            f.write(SCALE.pack(DTYPE_SCALES[dtype]))
+            f.truncate(size)
+        os.replace(tmp_path, path)
+        return cls(path, mode='w')
+
+    @property
+    def rows(self):
+        with open(self.path, 'rb') as f:
+            f.seek(ROWS_OFFSET)
+            return struct.unpack('<I', f.read(4))[0]
+
+    def _set_rows(self, rows):
+        with open(self.path, 'r+b') as f:
+            f.seek(ROWS_OFFSET)
+            f.write(struct.pack('<I', rows))
+
+    def append(self, timestamp, strikes):
+        """Ajoute une ligne (GEX net vol+oi projeté sur la grille) ; le compteur est publié après les données"""
+        rows = self.rows
+        if rows >= self.capacity or (rows and timestamp <= self._times[rows - 1]):
+            return False
+        data = np.asarray([s[:3] for s in strikes if isinstance(s, list) and len(s) >= 3], dtype=np.float64)
+        row = np.zeros(self.n_strikes, dtype=np.float64)
+        if len(data):
+            cols = np.rint((data[:, 0] - self.strike_min) / self.step).astype(np.int64)
+            inside = (cols >= 0) & (cols < self.n_strikes)
+            np.add.at(row, cols[inside], data[inside, 1] + data[inside, 2])
+        # Mise à l'échelle puis saturation au max du format : jamais d'inf dans la matrice
+        limit = float(np.finfo(self.dtype).max)
+        self._matrix[rows] = np.clip(row / self.scale, -limit, limit)
+        self._times[rows] = timestamp
+        self._matrix.flush()
+        self._times.flush()
+        self._set_rows(rows + 1)
+        return True
+
+    def session(self):
+        """(strikes, timestamps, matrice en GEX) de la session : vues mmap sans copie quand l'échelle vaut 1"""
+        rows = self.rows
+        matrix = self._matrix[:rows]
+        if self.scale != 1.0:
+            matrix = matrix.astype(np.float32) * np.float32(self.scale)
+        return self.strikes, self._times[:rows], matrix
+
+
+def heatmap_path(base_dir, ticker, aggregation, day):
+    return os.path.join(base_dir, f"{ticker.lower()}_{aggregation}_{day}.gexh")
+
+
+def load_session(path):
+    return GexHeatmap(path).session()
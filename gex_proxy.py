@@ -0,0 +1,146 @@
+"""
+Proxy local avec cache pour GexBot
+Les requêtes identiques simultanées sont fusionnées en un seul appel amont (single-flight)
+et les réponses sont gardées en cache jusqu'à la prochaine publication attendue (timestamp + intervalle).
+Usage : python gex_proxy.py puis GEXBOT_BASE_URL=http://127.0.0.1:8787 pour les autres outils.
+"""
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+from config import (UPSTREAM_URL, API_TIMEOUT, PROXY_HOST, PROXY_PORT,
+                    PROXY_PUBLISH_INTERVAL, PROXY_MIN_TTL, PROXY_MAX_TTL)
+
+
+def log(message):
+    timestamp = datetime.now().strftime('%H:%M:%S')
+    print(f"[{timestamp}] {message}")
+
+
+def cache_ttl(body, now):
+    """TTL calé sur le timestamp du payload : valable jusqu'à la prochaine publication attendue"""
+    try:
+        data_timestamp = float(json.loads(body).get('timestamp') or 0)
+    except (ValueError, AttributeError):
+        data_timestamp = 0
+    if not data_timestamp:
+        return PROXY_MIN_TTL
+    return min(PROXY_MAX_TTL, max(PROXY_MIN_TTL, data_timestamp + PROXY_PUBLISH_INTERVAL - now))
+
+
+class SingleFlightCache:
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.inflight = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'upstream_errors': 0}
+
+    def get(self, key):
+        """(status, content_type, body, source) ; source = HIT, MISS ou COALESCED"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry['expires'] > time.time():
+                self.stats['hits'] += 1
+                return entry['status'], entry['content_type'], entry['body'], 'HIT'
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = {'done': threading.Event(), 'result': None}
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            flight['done'].wait()
+            return flight['result'][:3] + ('COALESCED',)
+
+        try:
+            status, content_type, body = self.fetch(key)
+        except Exception as e:
+            status, content_type, body = 502, 'application/json', json.dumps({'error': str(e)}).encode()
+        flight['result'] = (status, content_type, body)
+
+        with self.lock:
+            if status == 200:
+                now = time.time()
+                self.entries[key] = {'status': status, 'content_type': content_type, 'body': body,
+                                     'expires': now + cache_ttl(body, now)}
+            else:
+                self.stats['upstream_errors'] += 1
+            del self.inflight[key]
+        flight['done'].set()
+        return status, content_type, body, 'MISS'
+
+    def purge(self):
+        now = time.time()
+        with self.lock:
+            for key in [k for k, e in self.entries.items() if e['expires'] <= now]:
+                del self.entries[key]
+
+
+def fetch_upstream(path_and_query):
+    response = requests.get(f"{UPSTREAM_URL}{path_and_query}", timeout=API_TIMEOUT,
+                            headers={'Accept': 'application/json', 'User-Agent': 'GEX-Levels-Proxy/1.0'})
+    return response.status_code, response.headers.get('Content-Type', 'application/json'), response.content
+
+
+CACHE = SingleFlightCache(fetch_upstream)
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    def _send(self, status, content_type, body, source=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if source:
+            self.send_header('X-Cache', source)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path == '/_proxy/stats':
+            stats = dict(CACHE.stats, entries=len(CACHE.entries))
+            return self._send(200, 'application/json', json.dumps(stats).encode())
+        status, content_type, body, source = CACHE.get(self.path)
+        self._send(status, content_type, body, source)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    host = PROXY_HOST
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PROXY_PORT
+    server = ThreadingHTTPServer((host, port), ProxyHandler)
+    server.daemon_threads = True
+
+    def purge_loop():
+        while True:
+            time.sleep(PROXY_MAX_TTL)
+            CACHE.purge()
+
+    threading.Thread(target=purge_loop, daemon=True).start()
+    log(f"🛰️  Proxy GexBot http://{host}:{port} -> {UPSTREAM_URL}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log("🛑 Proxy arrêté")
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Historique des niveaux générés et requêtes temporelles
+Un journal append-only par série et par jour : enregistrements (timestamp, colonne, valeur) de taille fixe
+et noms de colonnes dans un fichier .cols ; la lecture repasse au format colonne (timestamps triés + une colonne par niveau)
+"""
+import os
+from datetime import datetime, timezone, timedelta
+import numpy as np
+
+from config import LEVEL_HISTORY_DIR, LEVEL_HISTORY_LOOKBACK_DAYS
+
+
+METADATA_COLUMNS = ['spot_price', 'volatility_trigger', 'net_gex_volume', 'net_gex_oi', 'call_res_all', 'put_sup_all']
+
+
+def day_of(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y%m%d')
+
+
+RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('column', '<u2'), ('value', '<f8')])
+
+
+def day_path(key, day, base_dir=LEVEL_HISTORY_DIR):
+    return os.path.join(base_dir, f"{key}_{day}.bin")
+
+
+def columns_path(path):
+    return path[:-len('.bin')] + '.cols'
+
+
+def level_columns(df_levels, metadata):
+    """Aplatit un résultat generate_levels en {colonne: valeur}, 'type', 'type#2', ... par ordre d'importance"""
+    row = {col: float(metadata.get(col) or 0) for col in METADATA_COLUMNS}
+    seen = {}
+    for level_type, strike in zip(df_levels['type'], df_levels['strike']):
+        seen[level_type] = seen.get(level_type, 0) + 1
+        col = level_type if seen[level_type] == 1 else f"{level_type}#{seen[level_type]}"
+        row[col] = float(strike)
+    return row
+
+
+def read_columns(path):
+    cols_path = columns_path(path)
+    if not os.path.exists(cols_path):
+        return []
+    with open(cols_path, 'r', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def read_records(path):
+    """Enregistrements complets du journal (un enregistrement tronqué en fin de fichier est ignoré)"""
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+    return np.fromfile(path, dtype=RECORD_DTYPE, count=count)
+
+
+def last_timestamp(path):
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if size < RECORD_DTYPE.itemsize:
+        return None
+    offset = (size // RECORD_DTYPE.itemsize - 1) * RECORD_DTYPE.itemsize
+    return float(np.fromfile(path, dtype=RECORD_DTYPE, count=1, offset=offset)['timestamp'][0])
+
+
+def load_day(path):
+    """{'timestamps': [n], colonne: [n]} ; NaN quand le niveau était absent du snapshot"""
+    records = read_records(path)
+    if not len(records):
+        return None
+    names = read_columns(path)
+    timestamps, rows = np.unique(records['timestamp'], return_inverse=True)
+    day = {'timestamps': timestamps}
+    for col_id in np.unique(records['column']):
+        if col_id >= len(names):
+            continue
+        mask = records['column'] == col_id
+        values = np.full(len(timestamps), np.nan)
+        values[rows[mask]] = records['value'][mask]
+        day[names[col_id]] = values
+    return day
+
+
+def append_levels(key, df_levels, metadata, base_dir=LEVEL_HISTORY_DIR):
+    """
+    Ajoute un snapshot de niveaux au journal du jour (ignoré si le timestamp n'est pas nouveau).
+    Coût proportionnel au snapshot : les noms de colonnes inconnus sont ajoutés au .cols avant les enregistrements.
+    """
+    timestamp = float(metadata.get('data_timestamp') or 0)
+    path = day_path(key, day_of(timestamp), base_dir)
+    if os.path.exists(path) and os.path.getsize(path) % RECORD_DTYPE.itemsize:
+        # Écriture interrompue : on retire l'enregistrement tronqué avant d'ajouter
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize)
+    previous = last_timestamp(path)
+    if previous is not None and timestamp <= previous:
+        return False
+
+    os.makedirs(base_dir, exist_ok=True)
+    row = level_columns(df_levels, metadata)
+    names = read_columns(path)
+    ids = {name: i for i, name in enumerate(names)}
+    new_names = [col for col in row if col not in ids]
+    if new_names:
+        with open(columns_path(path), 'a', encoding='utf-8') as f:
+            f.write(''.join(f"{name}\n" for name in new_names))
+            f.flush()
+            os.fsync(f.fileno())
+        ids.update({name: len(names) + i for i, name in enumerate(new_names)})
+
+    records = np.zeros(len(row), dtype=RECORD_DTYPE)
+    records['timestamp'] = timestamp
+    records['column'] = [ids[col] for col in row]
+    records['value'] = list(row.values())
+    with open(path, 'ab') as f:
+        f.write(records.tobytes())
+    return True
+
+
+def file_signature(path):
+    """(taille, mtime) du journal, None s'il n'existe pas"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class LevelHistory:
+    """
+    Requêtes sur l'historique d'une série (ex: 'es_zero') ; les jours lus restent en cache
+    tant que le journal ne change pas (taille/mtime), le jour courant est donc relu après chaque append
+    """
+
+    def __init__(self, key, base_dir=LEVEL_HISTORY_DIR):
+        self.key = key
+        self.base_dir = base_dir
+        self._days = {}
+
+    def day(self, day):
+        path = day_path(self.key, day, self.base_dir)
+        signature = file_signature(path)
+        cached = self._days.get(day)
+        if cached is None or cached[0] != signature:
+            cached = self._days[day] = (signature, load_day(path) if signature else None)
+        return cached[1]
+
+    def invalidate(self, day=None):
+        if day is None:
+            self._days.clear()
+        else:
+            self._days.pop(day, None)
+
+    def days_between(self, start, end):
+        current = datetime.fromtimestamp(start, timezone.utc).date()
+        last = datetime.fromtimestamp(end, timezone.utc).date()
+        while current <= last:
+            yield current.strftime('%Y%m%d')
+            current += timedelta(days=1)
+
+    def at(self, column, timestamp):
+        """
+        Valeur de la colonne au dernier snapshot <= timestamp, None si absente.
+        Avant le premier snapshot du jour, c'est le dernier snapshot des jours précédents (LEVEL_HISTORY_LOOKBACK_DAYS)
+        """
+        current = datetime.fromtimestamp(timestamp, timezone.utc).date()
+        for _ in range(LEVEL_HISTORY_LOOKBACK_DAYS + 1):
+            data = self.day(current.strftime('%Y%m%d'))
+            current -= timedelta(days=1)
+            if data is None:
+                continue
+            idx = int(np.searchsorted(data['timestamps'], timestamp, side='right')) - 1
+            if idx < 0:
+                continue
+            if column not in data:
+                return None
+            value = data[column][idx]
+            return None if np.isnan(value) else float(value)
+        return None
+
+    def range(self, column, start, end):
+        """(timestamps, valeurs) des snapshots dans [start, end], NaN quand le niveau était absent"""
+        times, values = [], []
+        for day in self.days_between(start, end):
+            data = self.day(day)
+            if data is None:
+                continue
+            ts = data['timestamps']
+            lo = np.searchsorted(ts, start, side='left')
+            hi = np.searchsorted(ts, end, side='right')
+            times.append(ts[lo:hi])
+            column_values = data.get(column)
+            values.append(column_values[lo:hi] if column_values is not None else np.full(hi - lo, np.nan))
+        if not times:
+            return np.zeros(0), np.zeros(0)
+        return np.concatenate(times), np.concatenate(values)
+
+    def duration_above(self, column, reference, start, end):
+        """Secondes passées avec column > reference sur [start, end] (chaque snapshot vaut jusqu'au suivant)"""
+        ts, values = self.range(column, start, end)
+        _, ref_values = self.range(reference, start, end)
+        if not len(ts):
+            return 0.0
+        durations = np.diff(np.append(ts, end))
+        return float(durations[values > ref_values].sum())
@@ -0,0 +1,213 @@
+"""
+Agrégats matérialisés des niveaux et du régime gamma (5min, 1h, 1 jour)
+Enregistrements numpy de taille fixe, un fichier par série, granularité et partition (jour/mois/année) :
+chaque snapshot réécrit atomiquement la partition courante, la lecture est un simple np.fromfile
+"""
+import os
+from datetime import datetime, timezone
+import numpy as np
+
+from config import ROLLUP_DIR, ROLLUP_GRANULARITIES, ROLLUP_PARTITIONS, ROLLUP_MAX_GAP
+from gex_analytics import gamma_regime
+from output_writers import atomic_write
+
+
+ROLLUP_DTYPE = np.dtype([
+    ('bucket', 'i8'),
+    ('first_ts', 'f8'),
+    ('last_ts', 'f8'),
+    ('samples', 'i4'),
+    ('last_regime', 'i1'),
+    ('positive_seconds', 'f8'),
+    ('negative_seconds', 'f8'),
+    ('spot_low', 'f8'),
+    ('spot_high', 'f8'),
+    ('call_wall_low', 'f8'),
+    ('call_wall_high', 'f8'),
+    ('put_wall_low', 'f8'),
+    ('put_wall_high', 'f8'),
+    ('net_gex_volume_min', 'f8'),
+    ('net_gex_volume_max', 'f8'),
+    ('net_gex_oi_min', 'f8'),
+    ('net_gex_oi_max', 'f8')
+])
+
+# (champ min, champ max, valeur du snapshot)
+RANGE_FIELDS = [
+    ('spot_low', 'spot_high', 'spot'),
+    ('call_wall_low', 'call_wall_high', 'call_wall'),
+    ('put_wall_low', 'put_wall_high', 'put_wall'),
+    ('net_gex_volume_min', 'net_gex_volume_max', 'net_gex_volume'),
+    ('net_gex_oi_min', 'net_gex_oi_max', 'net_gex_oi')
+]
+
+
+def partition_of(timestamp, granularity):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(ROLLUP_PARTITIONS[granularity])
+
+
+def rollup_path(key, granularity, partition, base_dir=ROLLUP_DIR):
+    return os.path.join(base_dir, f"{key}_{granularity}_{partition}.bin")
+
+
+def list_partitions(key, granularity, base_dir=ROLLUP_DIR):
+    """Partitions existantes de la série, triées (les formats de date sont triables en texte)"""
+    if not os.path.isdir(base_dir):
+        return []
+    prefix, suffix = f"{key}_{granularity}_", '.bin'
+    return sorted(name[len(prefix):-len(suffix)] for name in os.listdir(base_dir)
+                  if name.startswith(prefix) and name.endswith(suffix))
+
+
+def read_partition(path):
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=ROLLUP_DTYPE)
+    return np.fromfile(path, dtype=ROLLUP_DTYPE)
+
+
+def wall_strike(df_levels, level_type):
+    strikes = df_levels.loc[df_levels['type'] == level_type, 'strike']
+    return float(strikes.iloc[0]) if not strikes.empty else np.nan
+
+
+def sample_of(df_levels, metadata):
+    """Valeurs d'un snapshot utilisées par les agrégats"""
+    return {
+        'timestamp': float(metadata.get('data_timestamp') or 0),
+        'regime': gamma_regime(metadata.get('spot_price'), metadata.get('volatility_trigger')),
+        'spot': float(metadata.get('spot_price') or np.nan),
+        'call_wall': wall_strike(df_levels, 'major_call_wall'),
+        'put_wall': wall_strike(df_levels, 'major_put_wall'),
+        'net_gex_volume': float(metadata.get('net_gex_volume') or 0),
+        'net_gex_oi': float(metadata.get('net_gex_oi') or 0)
+    }
+
+
+def new_row(bucket, timestamp=np.nan):
+    row = np.zeros(1, dtype=ROLLUP_DTYPE)[0]
+    row['bucket'] = bucket
+    row['first_ts'] = timestamp
+    row['last_ts'] = timestamp
+    for low, high, _ in RANGE_FIELDS:
+        row[low] = np.nan
+        row[high] = np.nan
+    return row
+
+
+def last_row(key, granularity, base_dir=ROLLUP_DIR):
+    """Dernière ligne de la série toutes partitions confondues, None si vide"""
+    for partition in reversed(list_partitions(key, granularity, base_dir)):
+        rows = read_partition(rollup_path(key, granularity, partition, base_dir))
+        if len(rows):
+            return rows[-1].copy()
+    return None
+
+
+def credit_regime(rows, last, width, timestamp):
+    """
+    Crédite le régime du snapshot précédent jusqu'à celui-ci (trou plafonné à ROLLUP_MAX_GAP)
+    sur chaque bucket traversé ; les buckets sans snapshot sont matérialisés avec samples = 0.
+    """
+    regime = int(last['last_regime'])
+    start = float(last['last_ts'])
+    end = min(timestamp, start + ROLLUP_MAX_GAP)
+    if end <= start or not regime:
+        return
+    field = 'positive_seconds' if regime > 0 else 'negative_seconds'
+    for bucket in range(int(start // width * width), int(end), width):
+        seconds = min(end, bucket + width) - max(start, bucket)
+        if seconds <= 0:
+            continue
+        if bucket not in rows:
+            rows[bucket] = new_row(bucket)
+            rows[bucket]['last_regime'] = regime
+        rows[bucket][field] += seconds
+
+
+def update_rollup(key, granularity, width, sample, base_dir=ROLLUP_DIR):
+    """Intègre un snapshot dans une granularité ; False si le timestamp n'est pas nouveau"""
+    timestamp = sample['timestamp']
+    last = last_row(key, granularity, base_dir)
+    if last is not None and timestamp <= last['last_ts']:
+        return False
+
+    rows = {}
+    if last is not None:
+        rows[int(last['bucket'])] = last
+        credit_regime(rows, last, width, timestamp)
+
+    bucket = int(timestamp // width * width)
+    row = rows.setdefault(bucket, new_row(bucket, timestamp))
+    if np.isnan(row['first_ts']):
+        row['first_ts'] = timestamp
+    row['last_ts'] = timestamp
+    row['samples'] += 1
+    row['last_regime'] = sample['regime']
+    for low, high, field in RANGE_FIELDS:
+        value = sample[field]
+        if np.isnan(value):
+            continue
+        row[low] = value if np.isnan(row[low]) else min(row[low], value)
+        row[high] = value if np.isnan(row[high]) else max(row[high], value)
+
+    # Remplacement de la dernière ligne et ajout des nouvelles, partition par partition
+    by_partition = {}
+    for bucket in sorted(rows):
+        by_partition.setdefault(partition_of(bucket, granularity), []).append(rows[bucket])
+    for partition, new_rows in by_partition.items():
+        path = rollup_path(key, granularity, partition, base_dir)
+        existing = read_partition(path)
+        first_bucket = new_rows[0]['bucket']
+        existing = existing[existing['bucket'] < first_bucket]
+        merged = np.concatenate([existing, np.array(new_rows, dtype=ROLLUP_DTYPE)])
+        atomic_write(path, merged.tobytes())
+    return True
+
+
+def append_rollups(key, df_levels, metadata, base_dir=ROLLUP_DIR):
+    """Met à jour les agrégats 5min/1h/1j d'une série à partir d'un résultat generate_levels"""
+    sample = sample_of(df_levels, metadata)
+    if not sample['timestamp']:
+        return False
+    updated = False
+    for granularity, width in ROLLUP_GRANULARITIES.items():
+        updated |= update_rollup(key, granularity, width, sample, base_dir)
+    return updated
+
+
+def load_rollups(key, granularity, start=None, end=None, base_dir=ROLLUP_DIR):
+    """Lignes (tableau structuré ROLLUP_DTYPE) dont le bucket commence dans [start, end]"""
+    partitions = list_partitions(key, granularity, base_dir)
+    if start is not None:
+        first = partition_of(start, granularity)
+        partitions = [p for p in partitions if p >= first]
+    if end is not None:
+        last = partition_of(end, granularity)
+        partitions = [p for p in partitions if p <= last]
+    if not partitions:
+        return np.zeros(0, dtype=ROLLUP_DTYPE)
+    rows = np.concatenate([read_partition(rollup_path(key, granularity, p, base_dir)) for p in partitions])
+    lo = np.searchsorted(rows['bucket'], start, side='left') if start is not None else 0
+    hi = np.searchsorted(rows['bucket'], end, side='right') if end is not None else len(rows)
+    return rows[lo:hi]
+
+
+def summarize(rows):
+    """Agrège des lignes en un seul résumé (ex: rapport hebdomadaire à partir des lignes 1j)"""
+    if not len(rows):
+        return None
+    positive = float(rows['positive_seconds'].sum())
+    negative = float(rows['negative_seconds'].sum())
+    summary = {
+        'start': int(rows['bucket'][0]),
+        'end': float(np.nanmax(rows['last_ts'])) if not np.isnan(rows['last_ts']).all() else None,
+        'samples': int(rows['samples'].sum()),
+        'positive_seconds': positive,
+        'negative_seconds': negative,
+        'positive_share': positive / (positive + negative) if positive + negative else None
+    }
+    for low, high, _ in RANGE_FIELDS:
+        lows, highs = rows[low], rows[high]
+        summary[low] = float(np.nanmin(lows)) if not np.isnan(lows).all() else None
+        summary[high] = float(np.nanmax(highs)) if not np.isnan(highs).all() else None
+    return summary
@@ -0,0 +1,117 @@
+"""
+Score de persistance des niveaux entre deux rafraîchissements
+Statistiques glissantes par (série, strike, type) : âge, EWMA du GEX, part des refreshs classé dans le top GEX.
+persistence = moyenne pondérée (PERSISTENCE_WEIGHTS) de l'âge, de cette part et de la force EWMA relative
+"""
+import os
+import json
+
+from config import (PERSISTENCE_STATE_FILE, PERSISTENCE_EWMA_ALPHA, PERSISTENCE_FULL_AGE,
+                    PERSISTENCE_MAX_MISSES, PERSISTENCE_MAX_ENTRIES, PERSISTENCE_TOP_N, PERSISTENCE_WEIGHTS)
+from output_writers import atomic_write
+
+
+def gex_by_strike(strikes):
+    return {
+        round(s[0], 2): s[1] + s[2]
+        for s in strikes if isinstance(s, list) and len(s) >= 3
+    }
+
+
+def level_key(level_type, strike, gex):
+    """
+    Clé de suivi d'un niveau. Un niveau interpolé hors strikes listés (zero gamma API ou local)
+    bouge d'une fraction de point à chaque refresh : il est suivi par type seul.
+    """
+    if round(strike, 2) in gex:
+        return f"{level_type}@{strike}"
+    return f"{level_type}@~"
+
+
+class PersistenceScorer:
+    """Mise à jour en O(niveaux) ; les strikes absents trop longtemps sont évincés"""
+
+    def __init__(self, state=None):
+        self.series = state or {}
+
+    @classmethod
+    def load(cls, path=PERSISTENCE_STATE_FILE):
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path=PERSISTENCE_STATE_FILE):
+        atomic_write(path, json.dumps(self.series))
+
+    def update(self, series_key, df_levels, chain_data):
+        """Met à jour les stats de la série et ajoute les colonnes age_min / ewma_gex / top_share / persistence"""
+        timestamp = float(chain_data.get('timestamp') or 0)
+        gex = gex_by_strike(chain_data.get('strikes', []))
+        stats = self.series.setdefault(series_key, {})
+
+        # Top GEX du set : les PERSISTENCE_TOP_N strikes de niveaux au |GEX| le plus fort
+        level_gex = [gex.get(round(strike, 2), 0.0) for strike in df_levels['strike']]
+        top_strikes = {
+            round(strike, 2)
+            for strike, _ in sorted(zip(df_levels['strike'], level_gex), key=lambda x: -abs(x[1]))[:PERSISTENCE_TOP_N]
+        }
+
+        entries, on_chain, seen = [], [], set()
+        for strike, level_type, strike_gex in zip(df_levels['strike'], df_levels['type'], level_gex):
+            key = level_key(level_type, strike, gex)
+            seen.add(key)
+            entry = stats.get(key)
+            if entry is None:
+                entry = stats[key] = {'first_seen': timestamp, 'last_seen': timestamp, 'ewma_gex': strike_gex,
+                                      'top_count': 0, 'hits': 0, 'misses': 0}
+            elif timestamp > entry['last_seen']:
+                entry['ewma_gex'] += PERSISTENCE_EWMA_ALPHA * (strike_gex - entry['ewma_gex'])
+            if timestamp > entry['last_seen'] or entry['hits'] == 0:
+                entry['hits'] += 1
+                if round(strike, 2) in top_strikes:
+                    entry['top_count'] += 1
+            entry['last_seen'] = timestamp
+            entry['misses'] = 0
+            entries.append(entry)
+            on_chain.append(round(strike, 2) in gex)
+
+        max_ewma = max((abs(e['ewma_gex']) for e in entries), default=0.0) or 1.0
+        ages, ewmas, top_shares, scores = [], [], [], []
+        for entry, listed in zip(entries, on_chain):
+            age = timestamp - entry['first_seen']
+            age_score = min(1.0, age / PERSISTENCE_FULL_AGE)
+            top_share = entry['top_count'] / entry['hits'] if entry['hits'] else 0.0
+            # Niveau interpolé hors strikes listés (zero gamma...) : pas de GEX propre, seul l'âge compte
+            score = age_score if not listed else (
+                PERSISTENCE_WEIGHTS['age'] * age_score
+                + PERSISTENCE_WEIGHTS['top'] * top_share
+                + PERSISTENCE_WEIGHTS['strength'] * abs(entry['ewma_gex']) / max_ewma)
+            ages.append(round(age / 60))
+            ewmas.append(round(entry['ewma_gex']))
+            top_shares.append(round(top_share, 2))
+            scores.append(round(min(1.0, score), 2))
+
+        for key in [k for k in stats if k not in seen]:
+            stats[key]['misses'] += 1
+            if stats[key]['misses'] > PERSISTENCE_MAX_MISSES:
+                del stats[key]
+
+        if len(stats) > PERSISTENCE_MAX_ENTRIES:
+            for key in sorted(stats, key=lambda k: stats[k]['last_seen'])[:len(stats) - PERSISTENCE_MAX_ENTRIES]:
+                del stats[key]
+
+        # persistence reste la 8e colonne (lue par le Pine Script), les stats suivent
+        df_levels['age_min'] = ages
+        df_levels['persistence'] = scores
+        df_levels['ewma_gex'] = ewmas
+        df_levels['top_share'] = top_shares
+        return df_levels
+
+    def entry(self, series_key, level_type, strike=None):
+        """Stats d'un niveau ; strike=None pour un niveau interpolé suivi par type"""
+        key = f"{level_type}@{strike}" if strike is not None else f"{level_type}@~"
+        return self.series.get(series_key, {}).get(key)
@@ -0,0 +1,89 @@
+"""
+Étape de sortie : écriture parallèle et atomique des fichiers générés
+Chaque sortie est isolée (une erreur n'empêche pas les autres) et le manifest est écrit en dernier
+"""
+import os
+import json
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from config import OUTPUT_WORKERS, RUN_MANIFEST_FILE
+
+
+def atomic_write(path, content):
+    """Écrit via un fichier temporaire du même dossier puis os.replace : jamais de fichier tronqué"""
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return hashlib.sha256(data).hexdigest()
+
+
+def run_sinks(sinks, max_workers=OUTPUT_WORKERS):
+    """
+    Exécute les sorties en parallèle. sinks = {nom: (chemin ou None, callable)}.
+    Le callable retourne le contenu à écrire atomiquement (str/bytes) ou None s'il écrit lui-même.
+    """
+    def run(name, path, render):
+        try:
+            content = render()
+            entry = {'status': 'ok', 'path': path}
+            if path and content is not None:
+                entry['sha256'] = atomic_write(path, content)
+            return name, entry
+        except Exception as e:
+            return name, {'status': 'error', 'path': path, 'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run, name, path, render) for name, (path, render) in sinks.items()]
+        return dict(f.result() for f in futures)
+
+
+def load_manifest(path=RUN_MANIFEST_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def merge_manifest(results, generated_at, refreshed=None, path=RUN_MANIFEST_FILE):
+    """
+    Manifest du run fusionné avec le précédent : une sortie non produite par ce run (run partiel)
+    ou en échec garde son entrée précédente ; chaque entrée porte le generated_at du run qui l'a écrite.
+    """
+    outputs = dict(load_manifest(path).get('outputs', {}))
+    errors = {}
+    for name, result in results.items():
+        if result['status'] == 'ok':
+            outputs[name] = dict(result, generated_at=generated_at)
+        else:
+            errors[name] = result
+    return {
+        'generated_at': generated_at,
+        'ok': not errors,
+        'refreshed': list(refreshed or []),
+        'outputs': outputs,
+        'errors': errors
+    }
+
+
+def write_manifest(results, generated_at, refreshed=None, path=RUN_MANIFEST_FILE):
+    """Manifest du run, écrit après toutes les sorties"""
+    manifest = merge_manifest(results, generated_at, refreshed, path)
+    atomic_write(path, json.dumps(manifest, indent=2))
+    return manifest
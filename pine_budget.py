@@ -0,0 +1,68 @@
+"""
+Sélection des niveaux embarqués dans le Pine Script sous un budget explicite
+Lignes / labels par série affichée, octets par string CSV et taille totale du script
+"""
+import heapq
+
+from config import PINE_PROXIMITY_WEIGHT, PINE_PROXIMITY_RANGE_PCT
+
+
+def escaped_size(text):
+    return len(text.replace('"', '\\"').encode('utf-8')) + 2
+
+
+def level_values(df_levels, spot):
+    """Valeur d'un niveau : importance + bonus de proximité au spot (décroît linéairement)"""
+    values = df_levels['importance'].astype(float)
+    if spot:
+        distance_pct = (df_levels['strike'] - spot).abs() / spot * 100
+        proximity = (1 - distance_pct / PINE_PROXIMITY_RANGE_PCT).clip(lower=0)
+        values = values + PINE_PROXIMITY_WEIGHT * proximity
+    return values
+
+
+def fit_to_budget(level_sets, budget, fixed_bytes):
+    """
+    Garde les niveaux de plus forte valeur qui tiennent dans le budget.
+    fixed_bytes = taille du script hors lignes CSV (template, métadonnées, profils).
+    Retourne ({clé: DataFrame filtré}, rapport).
+    """
+    max_levels = min(budget['max_lines'] - budget.get('reserved_lines', 0), budget['max_labels'])
+    kept, heap, total = {}, [], fixed_bytes
+
+    for key, (df_levels, metadata) in level_sets.items():
+        values = level_values(df_levels, metadata.get('spot_price', 0))
+        rows = df_levels.to_csv(index=False).splitlines()
+        total += escaped_size(rows[0])
+        sizes = [escaped_size(r) for r in rows[1:]]
+
+        selected, string_bytes = [], escaped_size(rows[0])
+        for pos in sorted(range(len(df_levels)), key=lambda p: -values.iloc[p]):
+            if len(selected) >= max_levels or string_bytes + sizes[pos] > budget['max_string_bytes']:
+                continue
+            selected.append(pos)
+            string_bytes += sizes[pos]
+        kept[key] = set(selected)
+        total += string_bytes - escaped_size(rows[0])
+        for pos in selected:
+            heapq.heappush(heap, (values.iloc[pos], key, pos, sizes[pos]))
+
+    while total > budget['max_script_bytes'] and heap:
+        _, key, pos, size = heapq.heappop(heap)
+        kept[key].discard(pos)
+        total -= size
+
+    selected_sets, dropped = {}, {}
+    for key, (df_levels, metadata) in level_sets.items():
+        mask = [pos in kept[key] for pos in range(len(df_levels))]
+        selected_sets[key] = (df_levels[mask], metadata)
+        removed = df_levels[[not m for m in mask]]
+        if not removed.empty:
+            dropped[key] = [f"{label} {strike}" for label, strike in zip(removed['label'], removed['strike'])]
+
+    report = {
+        'kept': sum(len(df) for df, _ in selected_sets.values()),
+        'dropped': dropped,
+        'script_bytes': total
+    }
+    return selected_sets, report
@@ -0,0 +1,43 @@
+"""
+Graphe de dépendances paresseux fetch → compute → render → write
+Seuls les noeuds nécessaires aux cibles demandées sont exécutés, une seule fois chacun
+"""
+
+
+class Pipeline:
+    def __init__(self):
+        self.nodes = {}
+        self.results = {}
+
+    def add(self, name, func, deps=()):
+        """Déclare un noeud ; func reçoit les résultats de ses dépendances dans l'ordre de deps"""
+        self.nodes[name] = (func, tuple(deps))
+
+    def plan(self, targets):
+        """Noeuds à exécuter pour produire les cibles, dans l'ordre topologique"""
+        order, visiting, seen = [], set(), set()
+
+        def visit(name):
+            if name in seen or name in self.results:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle de dépendances sur {name}")
+            if name not in self.nodes:
+                raise KeyError(f"Noeud inconnu: {name}")
+            visiting.add(name)
+            for dep in self.nodes[name][1]:
+                visit(dep)
+            visiting.discard(name)
+            seen.add(name)
+            order.append(name)
+
+        for target in targets:
+            visit(target)
+        return order
+
+    def evaluate(self, targets):
+        """Exécute le plan et retourne {cible: résultat}"""
+        for name in self.plan(targets):
+            func, deps = self.nodes[name]
+            self.results[name] = func(*[self.results[d] for d in deps])
+        return {target: self.results[target] for target in targets}
@@ -0,0 +1,118 @@
+"""
+Cadence de rafraîchissement adaptative par série (ticker/DTE)
+Apprend le rythme de publication GexBot à partir des timestamps successifs,
+accélère quand le spot se rapproche vite d'un mur ou du Zero Gamma, ralentit quand rien ne bouge.
+"""
+import os
+import json
+import time
+
+from config import (REFRESH_STATE_FILE, REFRESH_DEFAULT_INTERVALS, REFRESH_MIN_INTERVAL,
+                    REFRESH_MAX_INTERVAL, REFRESH_CADENCE_ALPHA, REFRESH_PUBLISH_LAG, REFRESH_SHORT_RETRIES)
+from request_planner import prioritize
+from output_writers import atomic_write
+
+
+KEY_LEVEL_TYPES = ('zero_gamma', 'major_call_wall', 'major_put_wall')
+
+
+def series_key(ticker, aggregation):
+    return f"{ticker}/{aggregation}"
+
+
+class RefreshScheduler:
+    def __init__(self, state=None):
+        self.series = state or {}
+
+    @classmethod
+    def load(cls, path=REFRESH_STATE_FILE):
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path=REFRESH_STATE_FILE):
+        atomic_write(path, json.dumps(self.series))
+
+    def _state(self, ticker, aggregation):
+        return self.series.setdefault(series_key(ticker, aggregation), {
+            'ticker': ticker,
+            'aggregation': aggregation,
+            'cadence': REFRESH_DEFAULT_INTERVALS.get(aggregation, REFRESH_MAX_INTERVAL),
+            'data_timestamp': 0,
+            'spot': 0,
+            'polled_at': 0,
+            'unchanged': 0,
+            'interval': REFRESH_DEFAULT_INTERVALS.get(aggregation, REFRESH_MAX_INTERVAL),
+            'next_due': 0
+        })
+
+    def observe(self, ticker, aggregation, chain_data, df_levels=None, now=None):
+        """Met à jour la série après un poll et calcule la prochaine échéance"""
+        now = now or time.time()
+        state = self._state(ticker, aggregation)
+        data_timestamp = float((chain_data or {}).get('timestamp') or 0)
+        spot = float((chain_data or {}).get('spot') or 0)
+
+        if data_timestamp > state['data_timestamp']:
+            if state['data_timestamp']:
+                sample = data_timestamp - state['data_timestamp']
+                state['cadence'] += REFRESH_CADENCE_ALPHA * (sample - state['cadence'])
+            state['unchanged'] = 0
+        else:
+            state['unchanged'] += 1
+
+        interval = min(REFRESH_MAX_INTERVAL, max(REFRESH_MIN_INTERVAL, state['cadence']))
+
+        # Aucun nouveau timestamp : publication en retard, on repasse à pas courts (REFRESH_MIN_INTERVAL)
+        # avant de basculer sur un backoff exponentiel (marché fermé, série figée)
+        if state['unchanged']:
+            extra = state['unchanged'] - REFRESH_SHORT_RETRIES
+            interval = REFRESH_MIN_INTERVAL if extra <= 0 else min(REFRESH_MAX_INTERVAL, REFRESH_MIN_INTERVAL * 2 ** extra)
+
+        # Sinon on se cale juste après la prochaine publication attendue
+        next_due = now + interval
+        if data_timestamp and not state['unchanged']:
+            expected_publish = data_timestamp + state['cadence'] + REFRESH_PUBLISH_LAG
+            if expected_publish > now:
+                next_due = min(now + REFRESH_MAX_INTERVAL, max(now + REFRESH_MIN_INTERVAL, expected_publish))
+
+        # Spot rapide par rapport à la distance du niveau clé le plus proche : on resserre
+        elapsed = now - state['polled_at'] if state['polled_at'] else 0
+        if elapsed > 0 and state['spot'] and spot and df_levels is not None and not df_levels.empty:
+            speed = abs(spot - state['spot']) / elapsed
+            key_strikes = df_levels.loc[df_levels['type'].isin(KEY_LEVEL_TYPES), 'strike']
+            if speed > 0 and not key_strikes.empty:
+                time_to_level = (key_strikes - spot).abs().min() / speed
+                next_due = min(next_due, now + max(REFRESH_MIN_INTERVAL, time_to_level / 2))
+
+        interval = next_due - now
+        state.update({
+            'data_timestamp': max(data_timestamp, state['data_timestamp']),
+            'spot': spot or state['spot'],
+            'polled_at': now,
+            'interval': round(interval, 1),
+            'next_due': next_due
+        })
+        return state
+
+    def defer(self, ticker, aggregation, delay=REFRESH_MIN_INTERVAL, now=None):
+        """Repousse une série dont le refresh a échoué (évite de la re-tenter en boucle)"""
+        now = now or time.time()
+        self._state(ticker, aggregation)['next_due'] = now + delay
+
+    def _next_due(self, ticker, aggregation):
+        """Échéance d'une série, 0 si jamais pollée (sans créer d'état)"""
+        return self.series.get(series_key(ticker, aggregation), {}).get('next_due', 0)
+
+    def due(self, series, now=None):
+        """Séries surveillées à rafraîchir maintenant (jamais pollées ou échéance passée), 0DTE d'abord"""
+        now = now or time.time()
+        return prioritize([s for s in series if self._next_due(*s) <= now])
+
+    def next_wakeup(self, series):
+        """Prochaine échéance parmi les séries surveillées"""
+        return min((self._next_due(*s) for s in series), default=time.time() + REFRESH_MAX_INTERVAL)
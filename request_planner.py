@@ -0,0 +1,72 @@
+"""
+Planification des appels GexBot
+Token bucket calé sur le quota API, ordre de priorité par DTE et suppression des appels /majors redondants
+"""
+import time
+import threading
+
+from config import API_QUOTA_PER_MINUTE, API_BURST, DTE_PRIORITY
+
+
+MAJOR_FIELDS = ['major_pos_vol', 'major_pos_oi', 'major_neg_vol', 'major_neg_oi']
+
+
+class TokenBucket:
+    """Seau de jetons : `rate` jetons par seconde, au plus `capacity` en réserve"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Bloque jusqu'à obtenir un jeton, retourne le temps d'attente en secondes"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def chain_has_majors(chain_data):
+    """La chaîne porte déjà les majors : generate_levels n'a pas besoin de /majors"""
+    return bool(chain_data) and all(chain_data.get(f) for f in MAJOR_FIELDS)
+
+
+def prioritize(series):
+    """Séries (ticker, agrégation) triées par priorité DTE (0DTE, puis 1DTE, puis full)"""
+    rank = {dte: i for i, dte in enumerate(DTE_PRIORITY)}
+    return sorted(series, key=lambda s: rank.get(s[1], len(rank)))
+
+
+class RequestPlanner:
+    def __init__(self, quota_per_minute=API_QUOTA_PER_MINUTE, burst=API_BURST):
+        self.bucket = TokenBucket(quota_per_minute / 60.0, burst)
+        self.stats = {'calls': 0, 'majors_skipped': 0, 'waited': 0.0}
+
+    def _call(self, fetch, *args):
+        self.stats['waited'] += self.bucket.acquire()
+        self.stats['calls'] += 1
+        return fetch(*args)
+
+    def fetch(self, ticker, aggregation, fetch_chain, fetch_majors):
+        """(chain, majors) d'une série ; majors vaut None si la chaîne les contient déjà"""
+        chain_data = self._call(fetch_chain, ticker, aggregation)
+        if not chain_data or not chain_data.get('strikes'):
+            return chain_data, None
+        if chain_has_majors(chain_data):
+            self.stats['majors_skipped'] += 1
+            return chain_data, None
+        return chain_data, self._call(fetch_majors, ticker, aggregation)
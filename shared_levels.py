@@ -0,0 +1,206 @@
+"""
+Table de niveaux partagée (fichier mmap) pour les consommateurs locaux
+Layout fixe et versionné, un slot par ticker/DTE protégé par un seqlock :
+l'écrivain passe le compteur en impair pendant l'écriture, puis en pair à la fin.
+Les lecteurs ne prennent aucun verrou et relisent tant que le compteur a bougé.
+"""
+import os
+import mmap
+import fcntl
+import time
+import numpy as np
+
+from config import LIVE_TABLE_PATH, LIVE_TABLE_MAX_LEVELS
+from output_writers import atomic_write
+
+
+MAGIC = b'GEXL'
+VERSION = 1
+
+SLOT_KEYS = ['es_zero', 'es_one', 'es_full', 'nq_zero', 'nq_one', 'nq_full']
+
+LEVEL_TYPES = [
+    '', 'zero_gamma', 'major_call_wall', 'major_put_wall', 'high_vol_level',
+    'put_wall_0dte', 'call_wall_0dte', 'call_wall_volume', 'put_wall_volume',
+    'call_wall_oi', 'put_wall_oi', 'call_wall_secondary', 'put_wall_secondary',
+    'strike_call', 'strike_put', 'vol_trigger', 'max_pain'
+]
+TYPE_CODES = {t: i for i, t in enumerate(LEVEL_TYPES)}
+
+META_FIELDS = [
+    'data_timestamp', 'spot_price', 'front_expiry_dte', 'next_expiry_dte',
+    'volatility_trigger', 'net_gex_volume', 'net_gex_oi', 'call_res_all', 'put_sup_all'
+]
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'), ('version', '<u4'), ('n_slots', '<u4'), ('max_levels', '<u4')
+])
+
+LEVEL_DTYPE = np.dtype([
+    ('strike', '<f8'), ('importance', 'u1'), ('type', 'u1'),
+    ('label', 'S30'), ('dte', 'S8'), ('description', 'S80')
+])
+
+
+def slot_dtype(max_levels):
+    return np.dtype([
+        ('seq', '<u8'),
+        ('key', 'S8'),
+        ('symbol', 'S8'),
+        ('published_at', '<f8'),
+        ('n_levels', '<u4'),
+        ('pad', '<u4'),
+        ('meta', '<f8', (len(META_FIELDS),)),
+        ('levels', LEVEL_DTYPE, (max_levels,))
+    ])
+
+
+class LiveLevelTable:
+    """Vue numpy zero-copy sur le fichier mmap ; mode 'w' pour update_gex, 'r' pour les lecteurs"""
+
+    def __init__(self, path=LIVE_TABLE_PATH, mode='r', max_levels=LIVE_TABLE_MAX_LEVELS):
+        self.path = path
+        self.writable = (mode == 'w')
+        dtype = slot_dtype(max_levels)
+        size = HEADER_DTYPE.itemsize + dtype.itemsize * len(SLOT_KEYS)
+
+        self._lock_fd = None
+        if self.writable:
+            # Un seul écrivain à la fois (run ponctuel et --watch peuvent coexister) : verrou sur un fichier
+            # à part, le fichier de la table pouvant être remplacé
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._lock_fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+
+        if self.writable and not self._layout_ok(path, size, max_levels):
+            # Nouveau layout construit à côté puis os.replace : un lecteur déjà mappé garde l'ancien inode
+            # (jamais de fichier tronqué ou remis à zéro sous ses pieds), il rouvre quand stale() le signale
+            self._create(path, size, max_levels)
+
+        with open(path, 'r+b' if self.writable else 'rb') as f:
+            self._ino = os.fstat(f.fileno()).st_ino
+            if self.writable:
+                self._mm = mmap.mmap(f.fileno(), size)
+            else:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.header = np.frombuffer(self._mm, dtype=HEADER_DTYPE, count=1)[0]
+        if self.header['magic'] != MAGIC or self.header['version'] != VERSION:
+            raise ValueError(f"{path}: format de table inconnu")
+
+        dtype = slot_dtype(int(self.header['max_levels']))
+        self.slots = np.frombuffer(self._mm, dtype=dtype, count=int(self.header['n_slots']),
+                                   offset=HEADER_DTYPE.itemsize)
+        self.max_levels = int(self.header['max_levels'])
+
+    @staticmethod
+    def _layout_ok(path, size, max_levels):
+        """Le fichier existant a la taille et l'en-tête attendus"""
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            return False
+        with open(path, 'rb') as f:
+            header = np.frombuffer(f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)[0]
+        return (header['magic'] == MAGIC and header['version'] == VERSION
+                and header['n_slots'] == len(SLOT_KEYS) and header['max_levels'] == max_levels)
+
+    @staticmethod
+    def _create(path, size, max_levels):
+        layout = bytearray(size)
+        header = np.frombuffer(layout, dtype=HEADER_DTYPE, count=1)[0]
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['n_slots'] = len(SLOT_KEYS)
+        header['max_levels'] = max_levels
+        atomic_write(path, bytes(layout))
+
+    def stale(self):
+        """Le fichier a été remplacé (changement de layout) : le lecteur doit rouvrir la table"""
+        try:
+            return os.stat(self.path).st_ino != self._ino
+        except OSError:
+            return True
+
+    def close(self):
+        self.header = self.slots = None
+        self._mm.close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def publish(self, key, df_levels, metadata):
+        """Écrit le set de niveaux d'un ticker/DTE (seqlock : seq impair pendant l'écriture)"""
+        slot = self.slots[SLOT_KEYS.index(key)]
+        records = df_levels.head(self.max_levels)
+        n = len(records)
+
+        # Conversion complète avant d'ouvrir l'écriture : une valeur invalide lève sans toucher au slot
+        symbol = str(metadata.get('underlying_symbol', '')).encode()[:8]
+        meta = [float(metadata.get(f) or 0) for f in META_FIELDS]
+        levels = np.zeros(n, dtype=LEVEL_DTYPE)
+        levels['strike'] = records['strike'].to_numpy(dtype=np.float64)
+        levels['importance'] = records['importance'].to_numpy()
+        levels['type'] = [TYPE_CODES.get(t, 0) for t in records['type']]
+        levels['label'] = [str(v).encode()[:30] for v in records['label']]
+        levels['dte'] = [str(v).encode()[:8] for v in records['dte']]
+        levels['description'] = [str(v).encode('utf-8')[:80] for v in records['description']]
+
+        # seq forcé impair à l'entrée et pair à la sortie, même si l'écriture échoue :
+        # un slot ne reste jamais bloqué en "écriture en cours"
+        seq = int(slot['seq']) | 1
+        slot['seq'] = seq
+        try:
+            slot['key'] = key.encode()
+            slot['symbol'] = symbol
+            slot['published_at'] = time.time()
+            slot['meta'] = meta
+            slot['levels'][:n] = levels
+            slot['n_levels'] = n
+        finally:
+            slot['seq'] = seq + 1
+
+    def version(self, key):
+        """Compteur seqlock du slot (pair = stable), permet de détecter un changement sans copier"""
+        return int(self.slots[SLOT_KEYS.index(key)]['seq'])
+
+    def read(self, key, retries=1000):
+        """Copie cohérente (levels, metadata) d'un slot, None si jamais publié"""
+        slot = self.slots[SLOT_KEYS.index(key)]
+        for _ in range(retries):
+            before = int(slot['seq'])
+            if before % 2 == 0:
+                snapshot = slot.copy()
+                if int(slot['seq']) == before:
+                    break
+            time.sleep(0)
+        else:
+            raise TimeoutError(f"{key}: écriture en cours trop longue")
+
+        if before == 0:
+            return None
+        n = int(snapshot['n_levels'])
+        metadata = dict(zip(META_FIELDS, snapshot['meta'].tolist()))
+        metadata['underlying_symbol'] = snapshot['symbol'].decode()
+        metadata['published_at'] = float(snapshot['published_at'])
+        metadata['version'] = before // 2
+        return snapshot['levels'][:n], metadata
+
+
+def read_levels(key, path=LIVE_TABLE_PATH):
+    """Lecture ponctuelle : retourne une liste de dicts au format des CSV"""
+    table = LiveLevelTable(path)
+    try:
+        result = table.read(key)
+    finally:
+        table.close()
+    if result is None:
+        return None, None
+    levels, metadata = result
+    rows = [{
+        'strike': float(lv['strike']),
+        'importance': int(lv['importance']),
+        'type': LEVEL_TYPES[lv['type']] if lv['type'] < len(LEVEL_TYPES) else '',
+        'label': lv['label'].decode(),
+        'dte': lv['dte'].decode(),
+        'description': lv['description'].decode('utf-8', 'ignore')
+    } for lv in levels]
+    return rows, metadata
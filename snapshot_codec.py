@@ -0,0 +1,231 @@
+"""
+Codec compact pour l'historique des chaînes GEX
+Keyframe périodique + deltas par strike, valeurs float32 quantifiées sur une grille de strikes partagée
+Index des keyframes dans un fichier .idx pour l'accès aléatoire par timestamp
+"""
+import os
+import struct
+from bisect import bisect_right
+import numpy as np
+
+from config import SNAPSHOT_KEYFRAME_INTERVAL, SNAPSHOT_GEX_QUANTUM
+
+
+KEYFRAME = 0
+DELTA = 1
+
+RECORD_HEADER = struct.Struct('<BdH')
+INDEX_ENTRY = struct.Struct('<dQ')
+
+SCALAR_FIELDS = [
+    'spot', 'zero_gamma', 'sum_gex_vol', 'sum_gex_oi',
+    'major_pos_vol', 'major_pos_oi', 'major_neg_vol', 'major_neg_oi',
+    'min_dte', 'sec_min_dte'
+]
+SCALARS_SIZE = 8 * len(SCALAR_FIELDS)
+
+
+def quantize(values, quantum=SNAPSHOT_GEX_QUANTUM):
+    return (np.round(np.asarray(values, dtype=np.float64) / quantum) * quantum).astype(np.float32)
+
+
+def chain_to_arrays(chain_data):
+    """Extrait (strikes, valeurs [vol, oi], scalaires) d'une réponse /classic"""
+    rows = [s for s in chain_data.get('strikes', []) if isinstance(s, list) and len(s) >= 3]
+    strikes = np.array([round(s[0], 2) for s in rows], dtype=np.float64)
+    values = quantize([[s[1], s[2]] for s in rows]).reshape(-1, 2)
+    scalars = np.array([chain_data.get(f) or 0 for f in SCALAR_FIELDS], dtype=np.float64)
+    return strikes, values, scalars
+
+
+def arrays_to_chain(timestamp, strikes, values, scalars):
+    """Reconstruit un dict au format /classic (sans max_priors)"""
+    chain = {f: float(v) for f, v in zip(SCALAR_FIELDS, scalars)}
+    chain['min_dte'] = int(chain['min_dte'])
+    chain['sec_min_dte'] = int(chain['sec_min_dte'])
+    chain['timestamp'] = timestamp
+    chain['strikes'] = [[float(k), float(v), float(o)] for k, (v, o) in zip(strikes, values)]
+    return chain
+
+
+class SnapshotWriter:
+    """Ajoute des snapshots à un fichier d'historique (append-only)"""
+
+    def __init__(self, path, keyframe_interval=SNAPSHOT_KEYFRAME_INTERVAL):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.keyframe_interval = keyframe_interval
+        self.grid = None
+        self.grid_pos = {}
+        self.values = None
+        self.last_timestamp = None
+        self.since_keyframe = 0
+        if os.path.exists(path):
+            self._resume()
+
+    def _resume(self):
+        """
+        Recharge l'état courant depuis le dernier keyframe du fichier existant.
+        Un enregistrement tronqué en fin de fichier (écriture interrompue) est retiré, ainsi que son entrée d'index.
+        """
+        reader = SnapshotReader(self.path)
+        size = os.path.getsize(self.path)
+        end = min(reader.valid_end(), size)
+        kept = [entry for entry in reader.keyframes if entry[1] < end]
+        if end < size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+        if len(kept) < len(reader.keyframes):
+            with open(self.index_path, 'wb') as idx:
+                idx.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in kept))
+        if end < size or len(kept) < len(reader.keyframes):
+            reader = SnapshotReader(self.path)
+        for timestamp, grid, values, _ in reader.iter_arrays(from_keyframe=-1):
+            if self.grid is not grid:
+                self._set_grid(grid)
+                self.since_keyframe = 0
+            self.values = values
+            self.last_timestamp = timestamp
+            self.since_keyframe += 1
+
+    def _set_grid(self, grid):
+        self.grid = grid
+        self.grid_pos = {k: i for i, k in enumerate(grid.tolist())}
+
+    def append(self, chain_data):
+        timestamp = chain_data.get('timestamp', 0)
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return False
+        strikes, values, scalars = chain_to_arrays(chain_data)
+        if not len(strikes):
+            return False
+
+        positions = [self.grid_pos.get(k, -1) for k in strikes.tolist()] if self.grid is not None else None
+        # Keyframe aussi quand un strike de la grille disparaît : un delta le laisserait à [k, 0, 0]
+        needs_keyframe = (
+            positions is None
+            or -1 in positions
+            or len(strikes) != len(self.grid)
+            or len(strikes) > 0xFFFF
+            or self.since_keyframe >= self.keyframe_interval
+        )
+
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            if needs_keyframe:
+                order = np.argsort(strikes)
+                grid, full = strikes[order], values[order]
+                f.write(RECORD_HEADER.pack(KEYFRAME, timestamp, len(grid)))
+                f.write(scalars.tobytes())
+                f.write(grid.tobytes())
+                f.write(full.tobytes())
+                with open(self.index_path, 'ab') as idx:
+                    idx.write(INDEX_ENTRY.pack(timestamp, offset))
+                self._set_grid(grid)
+                self.since_keyframe = 0
+            else:
+                full = np.zeros_like(self.values)
+                full[positions] = values
+                changed = np.nonzero(np.any(full != self.values, axis=1))[0].astype(np.uint16)
+                f.write(RECORD_HEADER.pack(DELTA, timestamp, len(changed)))
+                f.write(scalars.tobytes())
+                f.write(changed.tobytes())
+                f.write(full[changed].tobytes())
+
+        self.values = full
+        self.last_timestamp = timestamp
+        self.since_keyframe += 1
+        return True
+
+
+class SnapshotReader:
+    """Décodage séquentiel (replay) ou accès aléatoire par timestamp"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.keyframes = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % INDEX_ENTRY.size
+            self.keyframes = [INDEX_ENTRY.unpack_from(raw, i) for i in range(0, usable, INDEX_ENTRY.size)]
+        self.keyframe_times = [ts for ts, _ in self.keyframes]
+
+    def iter_arrays(self, from_keyframe=0, to_keyframe=None):
+        """
+        Génère (timestamp, grille, valeurs [n, 2], scalaires) des keyframes [from_keyframe, to_keyframe[.
+        Lecture segment par segment (un keyframe et ses deltas) : jamais plus que nécessaire en mémoire.
+        """
+        if not self.keyframes:
+            return
+        first = from_keyframe % len(self.keyframes)
+        last = len(self.keyframes) if to_keyframe is None else min(to_keyframe, len(self.keyframes))
+        with open(self.path, 'rb') as f:
+            for k in range(first, last):
+                start = self.keyframes[k][1]
+                f.seek(start)
+                if k + 1 < len(self.keyframes):
+                    data = f.read(self.keyframes[k + 1][1] - start)
+                else:
+                    data = f.read()
+                yield from self._decode_segment(data)
+
+    def valid_end(self):
+        """Offset de fin du dernier enregistrement complet (en-têtes seulement, depuis le dernier keyframe indexé)"""
+        if not os.path.exists(self.path):
+            return 0
+        start = self.keyframes[-1][1] if self.keyframes else 0
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        pos = 0
+        while pos + RECORD_HEADER.size + SCALARS_SIZE <= len(data):
+            kind, _, n = RECORD_HEADER.unpack_from(data, pos)
+            size = RECORD_HEADER.size + SCALARS_SIZE + n * (16 if kind == KEYFRAME else 10)
+            if pos + size > len(data):
+                break
+            pos += size
+        return start + pos
+
+    @staticmethod
+    def _decode_segment(data):
+        pos = 0
+        grid = values = None
+        while pos + RECORD_HEADER.size + SCALARS_SIZE <= len(data):
+            kind, timestamp, n = RECORD_HEADER.unpack_from(data, pos)
+            pos += RECORD_HEADER.size
+            scalars = np.frombuffer(data, dtype=np.float64, count=len(SCALAR_FIELDS), offset=pos)
+            pos += SCALARS_SIZE
+            if kind == KEYFRAME:
+                if pos + n * 16 > len(data):
+                    return
+                grid = np.frombuffer(data, dtype=np.float64, count=n, offset=pos)
+                pos += n * 8
+                values = np.frombuffer(data, dtype=np.float32, count=n * 2, offset=pos).reshape(n, 2).copy()
+                pos += n * 8
+            else:
+                if pos + n * 10 > len(data) or grid is None:
+                    return
+                changed = np.frombuffer(data, dtype=np.uint16, count=n, offset=pos)
+                pos += n * 2
+                values = values.copy()
+                values[changed] = np.frombuffer(data, dtype=np.float32, count=n * 2, offset=pos).reshape(n, 2)
+                pos += n * 8
+            yield timestamp, grid, values, scalars
+
+    def iter_snapshots(self):
+        for timestamp, grid, values, scalars in self.iter_arrays():
+            yield arrays_to_chain(timestamp, grid, values, scalars)
+
+    def at(self, timestamp):
+        """Dernier snapshot <= timestamp (dict /classic), None si antérieur au fichier"""
+        k = bisect_right(self.keyframe_times, timestamp) - 1
+        if k < 0:
+            return None
+        found = None
+        for ts, grid, values, scalars in self.iter_arrays(from_keyframe=k, to_keyframe=k + 1):
+            if ts > timestamp:
+                break
+            found = (ts, grid, values, scalars)
+        return arrays_to_chain(*found) if found else None
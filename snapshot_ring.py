@@ -0,0 +1,153 @@
+"""
+Ring buffer de snapshots GEX par ticker/DTE
+Calcule localement les variations de GEX par strike sur des fenêtres arbitraires
+"""
+import os
+import numpy as np
+
+from config import RING_BUFFER_CAPACITY, RING_BUFFER_MAX_STRIKES, RING_BUFFER_WINDOW_TOLERANCE
+
+
+class StrikeRingBuffer:
+    """Buffer circulaire de taille fixe : une ligne par snapshot, une colonne par strike"""
+
+    def __init__(self, capacity=RING_BUFFER_CAPACITY, max_strikes=RING_BUFFER_MAX_STRIKES):
+        self.capacity = capacity
+        self.max_strikes = max_strikes
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        # NaN = strike absent du snapshot (jamais compté comme une variation)
+        self.values = np.full((capacity, max_strikes), np.nan, dtype=np.float32)
+        self.strikes = np.zeros(max_strikes, dtype=np.float64)
+        self.columns = {}
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _idle_columns(self, keep):
+        """Colonnes recyclables : strike absent ou à 0 sur tout le buffer, hors strikes du snapshot courant"""
+        n = len(self.columns)
+        values = self.values[:, :n]
+        idle = (np.isnan(values) | (values == 0)).all(axis=0)
+        idle[list(keep)] = False
+        return list(np.flatnonzero(idle)[::-1])
+
+    def _assign_columns(self, keys):
+        """Colonne de chaque strike (-1 si le buffer est plein et qu'aucune colonne n'est recyclable)"""
+        known = {self.columns[k] for k in keys if k in self.columns}
+        free = None
+        cols = []
+        for key in keys:
+            col = self.columns.get(key)
+            if col is None:
+                if len(self.columns) < self.max_strikes:
+                    col = len(self.columns)
+                else:
+                    if free is None:
+                        free = self._idle_columns(known)
+                    if not free:
+                        cols.append(-1)
+                        continue
+                    col = int(free.pop())
+                    del self.columns[round(float(self.strikes[col]), 2)]
+                    self.values[:, col] = np.nan
+                self.columns[key] = col
+                self.strikes[col] = key
+                known.add(col)
+            cols.append(col)
+        return cols
+
+    def _slot(self, logical_idx):
+        """Index physique du i-ème snapshot (0 = le plus ancien)"""
+        return (self.head - self.count + logical_idx) % self.capacity
+
+    def push(self, timestamp, strikes):
+        """Ajoute un snapshot - O(strikes), écrase le plus ancien quand le buffer est plein"""
+        if self.count and timestamp <= self.timestamps[self._slot(self.count - 1)]:
+            return False
+
+        keys, gex = [], []
+        for strike_array in strikes:
+            if isinstance(strike_array, list) and len(strike_array) >= 3:
+                keys.append(round(strike_array[0], 2))
+                gex.append(strike_array[1] + strike_array[2])
+
+        row = self.values[self.head]
+        row[:] = np.nan
+        cols = self._assign_columns(keys)
+        for col, value in zip(cols, gex):
+            if col >= 0:
+                row[col] = value
+        self.timestamps[self.head] = timestamp
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def _find_at_or_before(self, timestamp):
+        """Recherche binaire du dernier snapshot <= timestamp, -1 si absent"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamps[self._slot(mid)] <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self._slot(lo - 1) if lo > 0 else -1
+
+    def delta(self, window_seconds, tolerance=RING_BUFFER_WINDOW_TOLERANCE):
+        """
+        Variation de GEX par strike entre le dernier snapshot et celui d'il y a window_seconds.
+        None si le snapshot de référence est plus ancien que la fenêtre de plus de tolerance × fenêtre
+        (buffer persisté d'une séance à l'autre, cron plus lent que la fenêtre). NaN pour les strikes absents.
+        """
+        if self.count < 2:
+            return None
+        latest = self._slot(self.count - 1)
+        target = self.timestamps[latest] - window_seconds
+        past = self._find_at_or_before(target)
+        if past < 0 or past == latest:
+            return None
+        if target - self.timestamps[past] > tolerance * window_seconds:
+            return None
+        n = len(self.columns)
+        return self.values[latest, :n] - self.values[past, :n]
+
+    def max_change(self, window_seconds):
+        """[strike, variation GEX] du strike le plus actif sur la fenêtre (même format que max_priors)"""
+        deltas = self.delta(window_seconds)
+        if deltas is None or np.isnan(deltas).all():
+            return None
+        idx = int(np.nanargmax(np.abs(deltas)))
+        return [float(self.strikes[idx]), float(deltas[idx])]
+
+    def vol_triggers(self, windows):
+        """Liste de (nom_fenêtre, [strike, variation]) pour chaque fenêtre disponible"""
+        triggers = []
+        for name, seconds in windows.items():
+            change = self.max_change(seconds)
+            if change:
+                triggers.append((name, change))
+        return triggers
+
+    def save(self, path):
+        np.savez(path, timestamps=self.timestamps, values=self.values, strikes=self.strikes,
+                 state=np.array([self.head, self.count, len(self.columns)], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path, capacity=RING_BUFFER_CAPACITY, max_strikes=RING_BUFFER_MAX_STRIKES):
+        ring = cls(capacity, max_strikes)
+        if not os.path.exists(path):
+            return ring
+        try:
+            with np.load(path) as data:
+                if data['values'].shape != ring.values.shape:
+                    return ring
+                ring.timestamps[:] = data['timestamps']
+                ring.values[:] = data['values']
+                ring.strikes[:] = data['strikes']
+                ring.head, ring.count, n_strikes = (int(v) for v in data['state'])
+        except Exception:
+            return cls(capacity, max_strikes)
+        ring.columns = {round(float(s), 2): i for i, s in enumerate(ring.strikes[:n_strikes])}
+        return ring
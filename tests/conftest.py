@@ -0,0 +1,27 @@
+import math
+import random
+
+import pytest
+
+
+def make_chain(timestamp, spot=6900.0, seed=0, n=60, step=5.0):
+    """Réponse /classic synthétique : GEX gaussien autour du spot, négatif sous le spot"""
+    rng = random.Random(seed)
+    base = round(spot / step) * step - n // 2 * step
+    strikes = []
+    for i in range(n):
+        k = base + i * step
+        g = 20000 * math.exp(-((k - spot) / 40) ** 2) * (1 if k > spot else -1) + rng.uniform(-300, 300)
+        strikes.append([k, g * 0.4, g * 0.6, [0] * 5])
+    return {
+        'timestamp': timestamp, 'ticker': 'SPX', 'spot': spot, 'zero_gamma': spot - 3,
+        'min_dte': 0, 'sec_min_dte': 1,
+        'major_pos_vol': spot + 10, 'major_pos_oi': spot + 20, 'major_neg_vol': spot - 10, 'major_neg_oi': spot - 20,
+        'sum_gex_vol': 1234.5, 'sum_gex_oi': -5678.9, 'strikes': strikes,
+        'max_priors': [[spot + 5, 3000], [spot - 5, -6000]]
+    }
+
+
+@pytest.fixture
+def chain_factory():
+    return make_chain
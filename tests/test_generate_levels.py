@@ -0,0 +1,25 @@
+from update_gex import generate_levels
+
+
+def vol_trigger_labels(df_levels):
+    return sorted(df_levels.loc[df_levels['type'] == 'vol_trigger', 'label'])
+
+
+def test_api_max_priors_fill_only_windows_missing_locally(chain_factory):
+    chain = chain_factory(1767225600)
+    chain['max_priors'] = [[6906.5, 3000], [6896.5, -6000], [6911.5, 2500]]
+    # Ring buffer encore court : seule la fenêtre 1min est calculée localement
+    local = [('1min', [6921.5, 7000])]
+    df_levels, _ = generate_levels('SPX', chain, None, 'zero', '0DTE', local)
+    triggers = df_levels[df_levels['type'] == 'vol_trigger'].set_index('label')['strike']
+    assert triggers['Vol Trigger (1min)'] == 6921.5
+    assert triggers['Vol Trigger (5min)'] == 6896.5
+    assert triggers['Vol Trigger (10min)'] == 6911.5
+    assert vol_trigger_labels(df_levels) == ['Vol Trigger (10min)', 'Vol Trigger (1min)', 'Vol Trigger (5min)']
+
+
+def test_api_max_priors_used_when_ring_buffer_is_empty(chain_factory):
+    chain = chain_factory(1767225600)
+    chain['max_priors'] = [[6906.5, 3000], [6896.5, -6000]]
+    df_levels, _ = generate_levels('SPX', chain, None, 'zero', '0DTE', [])
+    assert vol_trigger_labels(df_levels) == ['Vol Trigger (1min)', 'Vol Trigger (5min)']
@@ -0,0 +1,58 @@
+import numpy as np
+
+from gex_analytics import analyze_strikes, gamma_profile, max_pain, strike_arrays, zero_crossings
+
+
+def chain_strikes(net_gex, start=100.0, step=1.0):
+    """Lignes /classic [strike, gex_vol, gex_oi, priors] pour un GEX net donné par strike"""
+    return [[start + i * step, g * 0.25, g * 0.75, []] for i, g in enumerate(net_gex)]
+
+
+def test_single_sign_change_is_interpolated():
+    strikes = np.array([100.0, 105.0, 110.0])
+    np.testing.assert_allclose(zero_crossings(strikes, np.array([-30.0, -10.0, 30.0])), [106.25])
+
+
+def test_several_crossings_closest_to_spot_wins():
+    # Cumul [-10, 10, -10, 10, 10] : crossings à 100.5, 101.5 et 102.5
+    result = analyze_strikes(chain_strikes([-10, 20, -20, 20, 0]), spot=102.4)
+    assert result['zero_crossings'] == [100.5, 101.5, 102.5]
+    assert result['zero_gamma'] == 102.5
+    assert analyze_strikes(chain_strikes([-10, 20, -20, 20, 0]), spot=99.0)['zero_gamma'] == 100.5
+
+
+def test_exact_zero_counts_once():
+    strikes = np.array([100.0, 101.0, 102.0])
+    np.testing.assert_allclose(zero_crossings(strikes, np.array([-5.0, 0.0, 5.0])), [101.0])
+    np.testing.assert_allclose(zero_crossings(strikes, np.array([5.0, 0.0, -5.0])), [101.0])
+    # Contact sans changement de signe ou courbe nulle : pas de crossing
+    assert len(zero_crossings(strikes, np.array([5.0, 0.0, 5.0]))) == 0
+    assert len(zero_crossings(strikes, np.zeros(3))) == 0
+
+
+def test_max_pain_takes_first_smallest_absolute_gex():
+    strikes = np.array([100.0, 101.0, 102.0, 103.0])
+    assert max_pain(strikes, np.array([-50.0, 3.0, -3.0, 40.0])) == 101.0
+    assert max_pain(np.zeros(0), np.zeros(0)) is None
+
+
+def test_gamma_profile_buckets_sum_net_gex():
+    strike_values, net_gex = strike_arrays(chain_strikes([1, 2, 3, 4, 5, 6, 7, 8, 9]))
+    profile = gamma_profile(strike_values, net_gex, points=4)
+    assert [k for k, _ in profile] == [101.0, 103.0, 105.0, 107.0]
+    assert [g for _, g in profile] == [3.0, 7.0, 11.0, 24.0]
+    assert sum(g for _, g in profile) == net_gex.sum()
+
+
+def test_single_strike_profile_is_degenerate_but_valid():
+    result = analyze_strikes(chain_strikes([-42.0]), spot=100.0)
+    assert result == {'zero_gamma': None, 'zero_crossings': [], 'max_pain': 100.0,
+                      'gamma_profile': [[100.0, -42.0]]}
+    assert analyze_strikes([], spot=100.0) == {'zero_gamma': None, 'zero_crossings': [], 'max_pain': None,
+                                               'gamma_profile': []}
+
+
+def test_strike_arrays_sorts_and_skips_invalid_rows():
+    strike_values, net_gex = strike_arrays([[102.0, 1, 2, []], 'bad', [100.0, 3], [101.0, -1, -1, []]])
+    np.testing.assert_array_equal(strike_values, [101.0, 102.0])
+    np.testing.assert_array_equal(net_gex, [-2.0, 3.0])
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from gex_heatmap import GexHeatmap, load_session
+
+
+STRIKES = [[6890.0, 10.0, 1.0], [6900.0, 20.0, 2.0], [6910.0, 30.0, 3.0]]
+
+
+def test_append_and_reload_session(tmp_path):
+    path = str(tmp_path / 'es_zero_20260101.gexh')
+    heatmap = GexHeatmap.create(path, [s[0] for s in STRIKES], 6900.0, capacity=4, dtype='float32')
+    assert heatmap.append(1000, STRIKES)
+    assert heatmap.append(1060, [[6900.0, 5.0, 5.0]])
+    assert not heatmap.append(1060, STRIKES)
+
+    strikes, times, matrix = load_session(path)
+    assert list(times) == [1000, 1060]
+    col = int(np.flatnonzero(strikes == 6900.0)[0])
+    assert matrix[0, col] == 22.0 and matrix[1, col] == 10.0
+    assert matrix[1].sum() == 10.0
+
+
+def test_capacity_is_enforced(tmp_path):
+    path = str(tmp_path / 'es_zero_20260101.gexh')
+    heatmap = GexHeatmap.create(path, [s[0] for s in STRIKES], 6900.0, capacity=2, dtype='float16')
+    assert heatmap.append(1000, STRIKES) and heatmap.append(1060, STRIKES)
+    assert not heatmap.append(1120, STRIKES)
+    assert GexHeatmap(path).rows == 2
+
+
+def test_float16_keeps_realistic_gex_magnitudes(tmp_path):
+    path = str(tmp_path / 'es_zero_20260101.gexh')
+    strikes = [[6890.0, -120000.0, -30000.0], [6900.0, 200000.0, 44491.0], [6910.0, 1.5e6, 0.0]]
+    heatmap = GexHeatmap.create(path, [s[0] for s in strikes], 6900.0, capacity=2, dtype='float16')
+    assert heatmap.append(1000, strikes)
+    _, _, matrix = load_session(path)
+    assert np.isfinite(matrix).all()
+    grid = heatmap.strikes
+    for strike, vol, oi in strikes:
+        value = matrix[0, int(np.flatnonzero(grid == strike)[0])]
+        assert value == pytest.approx(vol + oi, rel=1e-3)
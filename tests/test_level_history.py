@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from level_history import LevelHistory, append_levels, day_path
+
+
+START = 1767225600  # 2026-01-01 00:00 UTC
+
+
+def levels(call_wall, extra_put=None):
+    rows = [(call_wall, 'major_call_wall'), (6850.0, 'put_wall_secondary')]
+    if extra_put:
+        rows.append((extra_put, 'put_wall_secondary'))
+    return pd.DataFrame(rows, columns=['strike', 'type'])
+
+
+def meta(timestamp, spot=6900.0, trigger=6890.0):
+    return {'data_timestamp': timestamp, 'spot_price': spot, 'volatility_trigger': trigger}
+
+
+def test_append_and_query_round_trip(tmp_path):
+    base = str(tmp_path)
+    append_levels('es_zero', levels(6950.0), meta(START), base)
+    append_levels('es_zero', levels(6960.0, extra_put=6840.0), meta(START + 60, spot=6880.0), base)
+    assert not append_levels('es_zero', levels(6970.0), meta(START + 60), base)
+    append_levels('es_zero', levels(6970.0), meta(START + 120), base)
+
+    history = LevelHistory('es_zero', base)
+    assert history.at('major_call_wall', START + 90) == 6960.0
+    assert history.at('put_wall_secondary#2', START + 60) == 6840.0
+    assert history.at('put_wall_secondary#2', START + 120) is None
+    ts, values = history.range('major_call_wall', START, START + 120)
+    np.testing.assert_array_equal(ts, [START, START + 60, START + 120])
+    np.testing.assert_array_equal(values, [6950.0, 6960.0, 6970.0])
+    assert history.duration_above('spot_price', 'volatility_trigger', START, START + 180) == 120
+
+
+def test_append_is_incremental_and_survives_torn_tail(tmp_path):
+    base = str(tmp_path)
+    append_levels('es_zero', levels(6950.0), meta(START), base)
+    path = day_path('es_zero', '20260101', base)
+    size = os.path.getsize(path)
+    append_levels('es_zero', levels(6960.0), meta(START + 60), base)
+    assert os.path.getsize(path) == 2 * size
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 5)
+    append_levels('es_zero', levels(6970.0), meta(START + 120), base)
+    assert LevelHistory('es_zero', base).at('major_call_wall', START + 120) == 6970.0
+
+
+def test_current_day_is_reloaded_after_append(tmp_path):
+    base = str(tmp_path)
+    append_levels('es_zero', levels(6950.0), meta(START), base)
+    history = LevelHistory('es_zero', base)
+    assert history.at('major_call_wall', START + 60) == 6950.0
+    append_levels('es_zero', levels(6960.0), meta(START + 60), base)
+    assert history.at('major_call_wall', START + 60) == 6960.0
+
+
+def test_at_falls_back_to_previous_days_before_first_snapshot(tmp_path):
+    base = str(tmp_path)
+    append_levels('es_zero', levels(6950.0), meta(START), base)
+    append_levels('es_zero', levels(6960.0), meta(START + 3600), base)
+    # Jour suivant vide, puis premier snapshot deux jours plus tard à 14h
+    append_levels('es_zero', levels(6990.0), meta(START + 2 * 86400 + 14 * 3600), base)
+
+    history = LevelHistory('es_zero', base)
+    assert history.at('major_call_wall', START - 60) is None
+    assert history.at('major_call_wall', START + 86400 + 60) == 6960.0
+    assert history.at('major_call_wall', START + 2 * 86400 + 60) == 6960.0
+    assert history.at('major_call_wall', START + 2 * 86400 + 14 * 3600) == 6990.0
+    assert history.at('put_wall_secondary#2', START + 2 * 86400 + 60) is None
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from level_rollups import append_rollups, load_rollups, summarize
+
+
+LEVELS = pd.DataFrame({'strike': [6950.0, 6850.0], 'type': ['major_call_wall', 'major_put_wall']})
+START = 1767225600  # 2026-01-01 00:00 UTC
+
+
+def metadata(timestamp, spot, trigger=6900.0):
+    return {'data_timestamp': timestamp, 'spot_price': spot, 'volatility_trigger': trigger,
+            'net_gex_volume': spot - 6900, 'net_gex_oi': 1.0}
+
+
+def test_regime_follows_project_convention(tmp_path):
+    append_rollups('es_zero', LEVELS, metadata(START, 6910), str(tmp_path))
+    append_rollups('es_zero', LEVELS, metadata(START + 60, 6890), str(tmp_path))
+    append_rollups('es_zero', LEVELS, metadata(START + 120, 6890), str(tmp_path))
+    summary = summarize(load_rollups('es_zero', '1h', base_dir=str(tmp_path)))
+    assert summary['negative_seconds'] == 60
+    assert summary['positive_seconds'] == 60
+    assert summary['net_gex_volume_min'] == -10 and summary['net_gex_volume_max'] == 10
+
+
+def test_granularities_agree_across_gaps(tmp_path):
+    append_rollups('es_zero', LEVELS, metadata(START + 30, 6890), str(tmp_path))
+    append_rollups('es_zero', LEVELS, metadata(START + 630, 6890), str(tmp_path))
+    five = load_rollups('es_zero', '5min', base_dir=str(tmp_path))
+    assert list(five['bucket']) == [START, START + 300, START + 600]
+    assert list(five['samples']) == [1, 0, 1]
+    totals = [summarize(load_rollups('es_zero', g, base_dir=str(tmp_path)))['positive_seconds']
+              for g in ('5min', '1h', '1d')]
+    assert totals == [600, 600, 600]
+
+
+def test_partitions_round_trip_and_range_query(tmp_path):
+    for day in range(3):
+        for i in range(3):
+            append_rollups('es_zero', LEVELS, metadata(START + day * 86400 + i * 300, 6890), str(tmp_path))
+    rows = load_rollups('es_zero', '5min', START + 86400, START + 2 * 86400 - 1, str(tmp_path))
+    assert rows['bucket'].min() >= START + 86400 and rows['bucket'].max() < START + 2 * 86400
+    days = load_rollups('es_zero', '1d', base_dir=str(tmp_path))
+    assert list(days['samples']) == [3, 3, 3]
+    assert not append_rollups('es_zero', LEVELS, metadata(START, 6890), str(tmp_path))
+    np.testing.assert_array_equal(days['call_wall_high'], [6950.0] * 3)
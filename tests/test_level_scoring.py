@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+import level_scoring
+from level_scoring import PersistenceScorer
+
+
+def chain(timestamp, gex):
+    return {'timestamp': timestamp, 'strikes': [[k, g, 0.0] for k, g in gex.items()]}
+
+
+def levels(*rows):
+    return pd.DataFrame(list(rows), columns=['strike', 'type'])
+
+
+GEX = {6890.0: -500.0, 6900.0: 1000.0, 6910.0: 200.0}
+
+
+def test_age_and_interpolated_zero_gamma_keep_their_history():
+    scorer = PersistenceScorer()
+    for i, zero_gamma in enumerate([6903.8, 6902.5, 6903.1, 6904.0]):
+        df = scorer.update('es_zero', levels((zero_gamma, 'zero_gamma'), (6900.0, 'major_call_wall')),
+                           chain(1000 + 600 * i, GEX))
+    assert list(df['age_min']) == [30, 30]
+    assert df['persistence'].iloc[0] == pytest.approx(1800 / level_scoring.PERSISTENCE_FULL_AGE, abs=0.01)
+    assert scorer.entry('es_zero', 'zero_gamma')['hits'] == 4
+
+
+def test_ewma_and_top_share(monkeypatch):
+    monkeypatch.setattr(level_scoring, 'PERSISTENCE_TOP_N', 1)
+    scorer = PersistenceScorer()
+    scorer.update('es_zero', levels((6900.0, 'major_call_wall'), (6910.0, 'call_wall_secondary')), chain(1000, GEX))
+    df = scorer.update('es_zero', levels((6900.0, 'major_call_wall'), (6910.0, 'call_wall_secondary')),
+                       chain(1060, {6900.0: 0.0, 6910.0: 200.0}))
+    alpha = level_scoring.PERSISTENCE_EWMA_ALPHA
+    assert df['ewma_gex'].iloc[0] == round(1000.0 + alpha * (0.0 - 1000.0))
+    # 6900 était le plus fort |GEX| au 1er refresh seulement, 6910 au 2e seulement
+    assert list(df['top_share']) == [0.5, 0.5]
+    # Même timestamp : pas de double comptage
+    scorer.update('es_zero', levels((6900.0, 'major_call_wall')), chain(1060, GEX))
+    assert scorer.entry('es_zero', 'major_call_wall', 6900.0)['hits'] == 2
+
+
+def test_missing_levels_are_evicted(monkeypatch):
+    monkeypatch.setattr(level_scoring, 'PERSISTENCE_MAX_MISSES', 2)
+    scorer = PersistenceScorer()
+    scorer.update('es_zero', levels((6890.0, 'major_put_wall'), (6900.0, 'major_call_wall')), chain(1000, GEX))
+    for i in range(1, 4):
+        scorer.update('es_zero', levels((6900.0, 'major_call_wall')), chain(1000 + 60 * i, GEX))
+    assert scorer.entry('es_zero', 'major_put_wall', 6890.0) is None
+    assert scorer.entry('es_zero', 'major_call_wall', 6900.0) is not None
+
+
+def test_save_load_round_trip(tmp_path):
+    scorer = PersistenceScorer()
+    scorer.update('es_zero', levels((6900.0, 'major_call_wall')), chain(1000, GEX))
+    path = str(tmp_path / 'persistence.json')
+    scorer.save(path)
+    assert PersistenceScorer.load(path).series == scorer.series
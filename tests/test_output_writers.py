@@ -0,0 +1,70 @@
+import json
+import os
+import stat
+
+import pytest
+
+import update_gex
+from output_writers import atomic_write, run_sinks, merge_manifest, write_manifest
+
+
+def test_atomic_write_replaces_content_without_leftovers(tmp_path):
+    path = str(tmp_path / 'out' / 'levels.csv')
+    atomic_write(path, 'old')
+    digest = atomic_write(path, b'new')
+    assert open(path, 'rb').read() == b'new'
+    assert len(digest) == 64
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert os.listdir(tmp_path / 'out') == ['levels.csv']
+
+
+def test_atomic_write_keeps_previous_file_on_error(tmp_path):
+    path = str(tmp_path / 'levels.csv')
+    atomic_write(path, 'old')
+    with pytest.raises(TypeError):
+        atomic_write(path, 42)
+    assert open(path).read() == 'old'
+    assert os.listdir(tmp_path) == ['levels.csv']
+
+
+def test_run_sinks_isolates_failures(tmp_path):
+    def broken():
+        raise RuntimeError('boom')
+
+    ok_path = str(tmp_path / 'ok.txt')
+    results = run_sinks({
+        'ok': (ok_path, lambda: 'content'),
+        'broken': (str(tmp_path / 'broken.txt'), broken),
+        'self': (None, lambda: None)
+    })
+    assert results['ok']['status'] == 'ok' and 'sha256' in results['ok']
+    assert results['broken'] == {'status': 'error', 'path': str(tmp_path / 'broken.txt'), 'error': 'boom'}
+    assert results['self'] == {'status': 'ok', 'path': None}
+    assert open(ok_path).read() == 'content'
+    assert not (tmp_path / 'broken.txt').exists()
+
+
+def test_manifest_keeps_entries_of_skipped_and_failed_outputs(tmp_path):
+    path = str(tmp_path / 'run_manifest.json')
+    write_manifest({'a.csv': {'status': 'ok', 'path': 'a.csv'},
+                    'b.csv': {'status': 'ok', 'path': 'b.csv'}}, 'T1', ['SPX/zero'], path)
+    manifest = merge_manifest({'a.csv': {'status': 'ok', 'path': 'a.csv'},
+                               'b.csv': {'status': 'error', 'path': 'b.csv', 'error': 'boom'}}, 'T2', None, path)
+    assert manifest['outputs']['a.csv']['generated_at'] == 'T2'
+    assert manifest['outputs']['b.csv']['generated_at'] == 'T1'
+    assert manifest['errors'] == {'b.csv': {'status': 'error', 'path': 'b.csv', 'error': 'boom'}}
+    assert not manifest['ok']
+    # merge_manifest ne réécrit pas le fichier
+    assert json.load(open(path))['generated_at'] == 'T1'
+
+
+def test_last_update_is_stamped_from_the_csvs_present(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Arbre neuf : une seule série écrite, les autres n'existent pas encore
+    update_gex.write_outputs({'csv': {'es_gex_zero.csv': 'strike,type\n'}}, '2026-01-02 00:00:00 UTC', ['SPX/zero'])
+    assert open('last_update.txt').read() == '2026-01-02 00:00:00 UTC'
+    # Un CSV hors manifest est daté par son mtime : le plus ancien fixe last_update
+    atomic_write('nq_gex_zero.csv', 'strike,type\n')
+    os.utime('nq_gex_zero.csv', (1767225600, 1767225600))
+    update_gex.write_outputs({'csv': {'es_gex_zero.csv': 'strike,type\n'}}, '2026-01-03 00:00:00 UTC', ['SPX/zero'])
+    assert open('last_update.txt').read() == '2026-01-01 00:00:00 UTC'
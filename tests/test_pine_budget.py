@@ -0,0 +1,72 @@
+import pandas as pd
+
+from pine_budget import fit_to_budget, level_values, escaped_size
+
+
+SPOT = 6900.0
+BIG = 10 ** 9
+
+
+def levels(rows):
+    """rows = [(strike, importance, label)]"""
+    return pd.DataFrame([{'strike': strike, 'importance': importance, 'type': 'level', 'label': label,
+                          'dte': '0DTE', 'description': ''} for strike, importance, label in rows])
+
+
+def level_set(rows, spot=SPOT):
+    return (levels(rows), {'spot_price': spot})
+
+
+def budget(max_lines=BIG, max_labels=BIG, max_string_bytes=BIG, max_script_bytes=BIG, reserved_lines=0):
+    return {'max_lines': max_lines, 'max_labels': max_labels, 'max_string_bytes': max_string_bytes,
+            'max_script_bytes': max_script_bytes, 'reserved_lines': reserved_lines}
+
+
+def kept_labels(selected, key):
+    return sorted(selected[key][0]['label'])
+
+
+# Même importance : la proximité au spot départage (B plus proche que C, D hors de la plage de proximité)
+ROWS = [(6900.0, 9, 'A'), (6910.0, 7, 'B'), (6950.0, 7, 'C'), (7200.0, 7, 'D'), (6800.0, 5, 'E')]
+
+
+def test_level_values_mix_importance_and_proximity():
+    values = level_values(levels(ROWS), SPOT)
+    assert list(values.rank(ascending=False).astype(int)) == [1, 2, 3, 4, 5]
+    assert values.iloc[3] == 7.0
+
+
+def test_line_and_label_caps_drop_lowest_value_levels():
+    sets = {'es_zero': level_set(ROWS)}
+    selected, report = fit_to_budget(sets, budget(max_lines=10, reserved_lines=7), 0)
+    assert kept_labels(selected, 'es_zero') == ['A', 'B', 'C']
+    assert report['kept'] == 3
+    assert report['dropped'] == {'es_zero': ['D 7200.0', 'E 6800.0']}
+
+    selected, report = fit_to_budget(sets, budget(max_labels=2), 0)
+    assert kept_labels(selected, 'es_zero') == ['A', 'B']
+    assert report['dropped'] == {'es_zero': ['C 6950.0', 'D 7200.0', 'E 6800.0']}
+
+
+def test_string_cap_keeps_highest_values_that_fit():
+    df = levels(ROWS)
+    rows = df.to_csv(index=False).splitlines()
+    limit = escaped_size(rows[0]) + escaped_size(rows[1]) + escaped_size(rows[2])
+    selected, report = fit_to_budget({'es_zero': (df, {'spot_price': SPOT})}, budget(max_string_bytes=limit), 0)
+    assert kept_labels(selected, 'es_zero') == ['A', 'B']
+    assert report['dropped'] == {'es_zero': ['C 6950.0', 'D 7200.0', 'E 6800.0']}
+
+
+def test_script_cap_drops_lowest_values_across_series():
+    sets = {'es_zero': level_set(ROWS), 'nq_zero': level_set([(6900.0, 8, 'F'), (7300.0, 6, 'G')])}
+    _, full = fit_to_budget(sets, budget(), 1000)
+    assert full['dropped'] == {}
+    row_size = escaped_size(levels(ROWS).to_csv(index=False).splitlines()[-1])
+
+    # Octets manquants pour deux lignes : E (5 + proximité) puis G (6) partent, pas D (7)
+    selected, report = fit_to_budget(sets, budget(max_script_bytes=full['script_bytes'] - row_size - 1), 1000)
+    assert report['dropped'] == {'es_zero': ['E 6800.0'], 'nq_zero': ['G 7300.0']}
+    assert kept_labels(selected, 'es_zero') == ['A', 'B', 'C', 'D']
+    assert kept_labels(selected, 'nq_zero') == ['F']
+    assert report['kept'] == 5
+    assert report['script_bytes'] <= full['script_bytes'] - row_size - 1
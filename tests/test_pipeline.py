@@ -0,0 +1,84 @@
+import pytest
+
+import update_gex
+from pipeline import Pipeline
+from level_scoring import PersistenceScorer
+
+
+def test_evaluate_runs_only_needed_nodes_once():
+    calls = []
+    pipeline = Pipeline()
+    pipeline.add('a', lambda: calls.append('a') or 1)
+    pipeline.add('b', lambda a: calls.append('b') or a + 1, ['a'])
+    pipeline.add('c', lambda a, b: calls.append('c') or a + b, ['a', 'b'])
+    pipeline.add('unused', lambda: calls.append('unused'))
+    assert pipeline.plan(['c']) == ['a', 'b', 'c']
+    assert pipeline.evaluate(['c', 'b']) == {'c': 3, 'b': 2}
+    assert calls == ['a', 'b', 'c']
+    assert pipeline.evaluate(['c']) == {'c': 3}
+    assert calls == ['a', 'b', 'c']
+
+
+def test_plan_rejects_cycles_and_unknown_nodes():
+    pipeline = Pipeline()
+    pipeline.add('a', lambda b: b, ['b'])
+    pipeline.add('b', lambda a: a, ['a'])
+    with pytest.raises(ValueError):
+        pipeline.plan(['a'])
+    with pytest.raises(KeyError):
+        pipeline.plan(['missing'])
+
+
+class RecordingPlanner:
+    def __init__(self, chain_factory):
+        self.chain_factory = chain_factory
+        self.fetched = []
+        self.stats = {'calls': 0, 'majors_skipped': 0, 'waited': 0.0}
+
+    def fetch(self, ticker, aggregation, fetch_chain, fetch_majors):
+        self.fetched.append((ticker, aggregation))
+        return self.chain_factory(1767225600, spot=6900.0 if ticker == 'SPX' else 25000.0), None
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # État résident (ring buffers, writers, heatmaps) propre à chaque test
+    for name in ('RING_BUFFERS', 'SNAPSHOT_WRITERS', 'HEATMAPS'):
+        monkeypatch.setattr(update_gex, name, {})
+    return tmp_path
+
+
+def run(requested, outputs, planner):
+    return update_gex.run_targets(requested, outputs, planner, PersistenceScorer(), {}, '2026-01-01 00:00:00 UTC')
+
+
+def test_partial_run_fetches_only_requested_series(workdir, chain_factory):
+    planner = RecordingPlanner(chain_factory)
+    run([('SPX', 'zero')], ['csv', 'pine'], planner)
+    assert planner.fetched == [('SPX', 'zero')]
+    assert (workdir / 'es_gex_zero.csv').exists()
+    assert not (workdir / 'nq_gex_zero.csv').exists()
+    # Autres séries sans cache ni CSV : la sortie Pine partagée n'est pas publiée amputée
+    assert not (workdir / update_gex.PINE_OUTPUT_FILE).exists()
+
+
+def test_partial_run_fills_other_series_from_cache(workdir, chain_factory):
+    planner = RecordingPlanner(chain_factory)
+    run([(t, a) for t in update_gex.TICKERS for a in update_gex.DTE_PERIODS], ['csv'], planner)
+    planner.fetched.clear()
+    run([('SPX', 'zero')], ['pine', 'json'], planner)
+    assert planner.fetched == [('SPX', 'zero')]
+    pine = (workdir / update_gex.PINE_OUTPUT_FILE).read_text()
+    for key in ('es_csv_zero', 'es_csv_one', 'nq_csv_full'):
+        assert f'string {key} = ""' not in pine
+
+
+def test_partial_run_falls_back_to_published_csv(workdir, chain_factory):
+    planner = RecordingPlanner(chain_factory)
+    run([(t, a) for t in update_gex.TICKERS for a in update_gex.DTE_PERIODS], ['csv'], planner)
+    for cached in (workdir / update_gex.LEVEL_CACHE_DIR).iterdir():
+        cached.unlink()
+    run([('SPX', 'zero')], ['pine'], planner)
+    pine = (workdir / update_gex.PINE_OUTPUT_FILE).read_text()
+    assert 'string nq_csv_one = ""' not in pine
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from config import (REFRESH_MIN_INTERVAL, REFRESH_MAX_INTERVAL, REFRESH_PUBLISH_LAG,
+                    REFRESH_SHORT_RETRIES, REFRESH_DEFAULT_INTERVALS)
+from refresh_scheduler import RefreshScheduler
+
+
+def chain(timestamp, spot=6900.0):
+    return {'timestamp': timestamp, 'spot': spot}
+
+
+def test_poll_is_aligned_after_the_expected_publish():
+    scheduler = RefreshScheduler()
+    state = scheduler.observe('SPX', 'zero', chain(1000), now=1010)
+    cadence = REFRESH_DEFAULT_INTERVALS['zero']
+    assert state['next_due'] == pytest.approx(1000 + cadence + REFRESH_PUBLISH_LAG)
+
+
+def test_cadence_is_learned_from_timestamps():
+    scheduler = RefreshScheduler()
+    for i in range(30):
+        state = scheduler.observe('SPX', 'full', chain(1000 + 30 * i), now=1001 + 30 * i)
+    assert state['cadence'] == pytest.approx(30, abs=1)
+
+
+def test_late_publish_retries_short_then_backs_off():
+    scheduler = RefreshScheduler()
+    scheduler.observe('SPX', 'zero', chain(1000), now=1001)
+    intervals = [scheduler.observe('SPX', 'zero', chain(1000), now=1100 + 100 * i)['interval']
+                 for i in range(REFRESH_SHORT_RETRIES + 3)]
+    assert intervals[:REFRESH_SHORT_RETRIES] == [REFRESH_MIN_INTERVAL] * REFRESH_SHORT_RETRIES
+    assert intervals[REFRESH_SHORT_RETRIES:] == [min(REFRESH_MAX_INTERVAL, REFRESH_MIN_INTERVAL * 2 ** k)
+                                                for k in (1, 2, 3)]
+
+
+def test_fast_spot_near_a_key_level_tightens_the_next_poll():
+    scheduler = RefreshScheduler()
+    levels = pd.DataFrame({'strike': [6910.0], 'type': ['major_call_wall']})
+    scheduler.observe('SPX', 'full', chain(1000, spot=6880.0), levels, now=1000)
+    state = scheduler.observe('SPX', 'full', chain(1300, spot=6900.0), levels, now=1300)
+    # 20 points en 300s, mur à 10 points : ~150s pour l'atteindre, on revient à mi-chemin
+    assert state['interval'] == pytest.approx(75, abs=1)
+
+
+def test_due_and_next_wakeup_only_consider_watched_series():
+    scheduler = RefreshScheduler()
+    watched = [('SPX', 'zero'), ('SPX', 'full')]
+    assert scheduler.due(watched, now=0) == watched
+    scheduler.observe('SPX', 'zero', chain(1000), now=1001)
+    scheduler.observe('SPX', 'full', chain(1000), now=1001)
+    assert scheduler.due([('SPX', 'full'), ('SPX', 'zero')], now=1001) == []
+    assert set(scheduler.series) == {'SPX/zero', 'SPX/full'}
+    assert scheduler.next_wakeup(watched) == min(s['next_due'] for s in scheduler.series.values())
+    assert scheduler.due(watched, now=10 ** 6) == [('SPX', 'zero'), ('SPX', 'full')]
+    assert scheduler.due([('NDX', 'zero')], now=1001) == [('NDX', 'zero')]
+    assert 'NDX/zero' not in scheduler.series
+
+
+def test_defer_and_round_trip(tmp_path):
+    scheduler = RefreshScheduler()
+    scheduler.defer('SPX', 'zero', now=1000)
+    assert scheduler.next_wakeup([('SPX', 'zero')]) == 1000 + REFRESH_MIN_INTERVAL
+    path = str(tmp_path / 'schedule.json')
+    scheduler.save(path)
+    assert RefreshScheduler.load(path).series == scheduler.series
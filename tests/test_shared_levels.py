@@ -0,0 +1,64 @@
+import fcntl
+import os
+
+import pytest
+import pandas as pd
+
+from shared_levels import LiveLevelTable, read_levels
+
+
+LEVELS = pd.DataFrame({
+    'strike': [6900.0, 6950.0], 'importance': [10, 10], 'type': ['zero_gamma', 'major_call_wall'],
+    'label': ['Zero Gamma', 'Major Call Wall'], 'dte': ['0DTE', '0DTE'], 'description': ['a', 'b']
+})
+
+
+def test_publish_read_round_trip(tmp_path):
+    path = str(tmp_path / 'live.bin')
+    writer = LiveLevelTable(path, mode='w', max_levels=8)
+    writer.publish('es_zero', LEVELS, {'spot_price': 6910.0, 'underlying_symbol': 'SPX'})
+    rows, metadata = read_levels('es_zero', path)
+    assert [r['strike'] for r in rows] == [6900.0, 6950.0]
+    assert rows[1]['type'] == 'major_call_wall'
+    assert metadata['spot_price'] == 6910.0 and metadata['version'] == 1
+    assert read_levels('nq_full', path) == (None, None)
+    writer.close()
+
+
+def test_layout_change_replaces_file_under_mapped_reader(tmp_path):
+    path = str(tmp_path / 'live.bin')
+    first = LiveLevelTable(path, mode='w', max_levels=8)
+    first.publish('es_zero', LEVELS, {'spot_price': 1.0})
+    first.close()
+    reader = LiveLevelTable(path)
+    writer = LiveLevelTable(path, mode='w', max_levels=16)
+    assert reader.stale()
+    levels, metadata = reader.read('es_zero')
+    assert list(levels['strike']) == [6900.0, 6950.0]
+    assert LiveLevelTable(path).read('es_zero') is None
+    reader.close()
+    writer.close()
+
+
+def test_failed_publish_leaves_slot_readable(tmp_path):
+    path = str(tmp_path / 'live.bin')
+    writer = LiveLevelTable(path, mode='w', max_levels=8)
+    with pytest.raises(ValueError):
+        writer.publish('es_zero', LEVELS, {'spot_price': 'n/a'})
+    assert writer.version('es_zero') % 2 == 0
+    writer.publish('es_zero', LEVELS, {'spot_price': 6910.0})
+    assert writer.version('es_zero') % 2 == 0
+    levels, metadata = writer.read('es_zero')
+    assert metadata['spot_price'] == 6910.0
+    writer.close()
+
+
+def test_second_writer_waits_for_the_lock(tmp_path):
+    path = str(tmp_path / 'live.bin')
+    writer = LiveLevelTable(path, mode='w', max_levels=8)
+    fd = os.open(path + '.lock', os.O_RDWR)
+    with pytest.raises(BlockingIOError):
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    writer.close()
+    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    os.close(fd)
@@ -0,0 +1,73 @@
+import numpy as np
+
+from snapshot_codec import SnapshotReader, SnapshotWriter
+
+
+def chain(timestamp, shift=0.0, strikes=(6890.0, 6900.0, 6910.0)):
+    return {
+        'timestamp': timestamp, 'spot': 6900.0 + shift, 'zero_gamma': 6895.0, 'min_dte': 0, 'sec_min_dte': 1,
+        'strikes': [[k, 100.0 * i + shift, -50.0 * i] for i, k in enumerate(strikes)]
+    }
+
+
+def write(path, count, keyframe_interval=4):
+    writer = SnapshotWriter(path, keyframe_interval=keyframe_interval)
+    for i in range(count):
+        strikes = (6890.0, 6900.0, 6910.0) if i < count // 2 else (6900.0, 6910.0, 6920.0)
+        writer.append(chain(1000 + 60 * i, shift=float(i % 3), strikes=strikes))
+
+
+def test_replay_round_trip(tmp_path):
+    path = str(tmp_path / 'es_zero.bin')
+    write(path, 11)
+    snapshots = list(SnapshotReader(path).iter_snapshots())
+    assert [s['timestamp'] for s in snapshots] == [1000 + 60 * i for i in range(11)]
+    for i, snapshot in enumerate(snapshots):
+        expected = chain(1000 + 60 * i, shift=float(i % 3),
+                         strikes=(6890.0, 6900.0, 6910.0) if i < 5 else (6900.0, 6910.0, 6920.0))
+        assert snapshot['spot'] == expected['spot']
+        got = {k: (v, o) for k, v, o in snapshot['strikes']}
+        for k, v, o in expected['strikes']:
+            assert got[k] == (v, o)
+
+
+def test_random_access_matches_replay(tmp_path):
+    path = str(tmp_path / 'es_zero.bin')
+    write(path, 11)
+    reader = SnapshotReader(path)
+    assert len(reader.keyframes) > 2
+    replay = list(reader.iter_snapshots())
+    for i, snapshot in enumerate(replay):
+        assert reader.at(1000 + 60 * i + 30) == snapshot
+    assert reader.at(999) is None
+
+
+def test_writer_resumes_existing_file(tmp_path):
+    path = str(tmp_path / 'es_zero.bin')
+    write(path, 3)
+    writer = SnapshotWriter(path, keyframe_interval=4)
+    assert not writer.append(chain(1000))
+    assert writer.append(chain(2000, shift=1.0))
+    last = SnapshotReader(path).at(2000)
+    np.testing.assert_array_equal([s[1] for s in last['strikes']], [1.0, 101.0, 201.0])
+
+
+def test_removed_strike_is_not_replayed(tmp_path):
+    path = str(tmp_path / 'es_zero.bin')
+    writer = SnapshotWriter(path, keyframe_interval=60)
+    writer.append({'timestamp': 1, 'strikes': [[6900.0, 10.0, 1.0], [6905.0, 5.0, 2.0]]})
+    writer.append({'timestamp': 2, 'strikes': [[6900.0, 10.0, 1.0]]})
+    assert SnapshotReader(path).at(2)['strikes'] == [[6900.0, 10.0, 1.0]]
+
+
+def test_resume_drops_torn_trailing_record(tmp_path):
+    path = str(tmp_path / 'es_zero.bin')
+    write(path, 6)
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * 7)
+    writer = SnapshotWriter(path, keyframe_interval=4)
+    assert writer.last_timestamp == 1000 + 60 * 5
+    assert writer.append(chain(5000, shift=2.0))
+    snapshots = list(SnapshotReader(path).iter_snapshots())
+    assert [s['timestamp'] for s in snapshots][-2:] == [1000 + 60 * 5, 5000]
+    assert snapshots[-1] == SnapshotReader(path).at(5000)
@@ -0,0 +1,52 @@
+import numpy as np
+
+from snapshot_ring import StrikeRingBuffer
+
+
+def chain(*strikes):
+    return [[strike, gex, 0.0] for strike, gex in strikes]
+
+
+def test_delta_ignores_stale_reference():
+    ring = StrikeRingBuffer(capacity=8, max_strikes=4)
+    ring.push(1000, chain((100, 10)))
+    ring.push(1000 + 86400, chain((100, 50)))
+    assert ring.delta(60) is None
+    assert ring.delta(3600) is None
+    assert ring.vol_triggers({'1min': 60, '1h': 3600}) == []
+
+
+def test_delta_within_window():
+    ring = StrikeRingBuffer(capacity=8, max_strikes=4)
+    for i, gex in enumerate([10, 20, 35]):
+        ring.push(1000 + 60 * i, chain((100, gex)))
+    assert ring.max_change(60) == [100.0, 15.0]
+    assert ring.max_change(120) == [100.0, 25.0]
+
+
+def test_absent_strike_is_not_a_trigger():
+    ring = StrikeRingBuffer(capacity=8, max_strikes=4)
+    ring.push(1000, chain((100, 500), (105, 10)))
+    ring.push(1060, chain((105, 30)))
+    assert ring.max_change(60) == [105.0, 20.0]
+
+
+def test_idle_columns_are_recycled():
+    ring = StrikeRingBuffer(capacity=2, max_strikes=2)
+    ring.push(1000, chain((100, 5), (105, 5)))
+    ring.push(1060, chain((110, 0), (115, 0)))
+    ring.push(1120, chain((110, 0), (115, 0)))
+    ring.push(1180, chain((110, 0), (115, 1000)))
+    assert ring.max_change(60) == [115.0, 1000.0]
+
+
+def test_save_load_round_trip(tmp_path):
+    ring = StrikeRingBuffer(capacity=4, max_strikes=4)
+    for i in range(6):
+        ring.push(1000 + 60 * i, chain((100, i), (105, 2 * i)))
+    path = str(tmp_path / 'ring.npz')
+    ring.save(path)
+    loaded = StrikeRingBuffer.load(path, capacity=4, max_strikes=4)
+    assert len(loaded) == len(ring)
+    assert loaded.columns == ring.columns
+    np.testing.assert_array_equal(loaded.delta(120), ring.delta(120))
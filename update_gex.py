@@ -5,10 +5,27 @@ Auto-détection ES/NQ + Sélecteur DTE + Multiplicateurs FIXES
 """
 import requests
 import pandas as pd
+import json
+import time
+import argparse
 from datetime import datetime, timezone
 import sys
 import os
 from config import *
+from snapshot_ring import StrikeRingBuffer
+from snapshot_codec import SnapshotWriter
+from shared_levels import LiveLevelTable
+from level_history import append_levels
+from level_rollups import append_rollups
+from level_scoring import PersistenceScorer
+from output_writers import atomic_write, run_sinks, merge_manifest, write_manifest
+from request_planner import RequestPlanner, prioritize
+from gex_analytics import analyze_strikes, gamma_regime, regime_label
+from gex_heatmap import GexHeatmap, heatmap_path
+from pine_budget import fit_to_budget
+from artifact_bundle import publish_bundle
+from refresh_scheduler import RefreshScheduler
+from pipeline import Pipeline
 
 
 
@@ -23,6 +40,18 @@ TICKERS = {
 
 DTE_PERIODS = {'zero': 'ZERO', 'one': 'ONE', 'full': 'FULL'}
 
+MAX_PRIORS_INTERVALS = ['1min', '5min', '10min', '15min', '30min', '1h']
+
+RING_BUFFERS = {}
+
+SNAPSHOT_WRITERS = {}
+
+HEATMAPS = {}
+
+OUTPUT_KINDS = ['csv', 'pine', 'json', 'bundle', 'history', 'rollups', 'live']
+
+FRESH_ONLY_OUTPUTS = ('csv', 'history', 'rollups', 'live')
+
 
 
 def log(message):
@@ -60,6 +89,64 @@ def fetch_gex_majors(ticker, aggregation):
 
 
 
+def ring_buffer_path(ticker, aggregation):
+    return os.path.join(STATE_DIR, f"ring_{ticker.lower()}_{aggregation}.npz")
+
+
+
+def get_ring_buffer(ticker, aggregation):
+    """Ring buffer résident du couple ticker/DTE, rechargé depuis STATE_DIR au premier accès"""
+    key = (ticker, aggregation)
+    if key not in RING_BUFFERS:
+        RING_BUFFERS[key] = StrikeRingBuffer.load(ring_buffer_path(ticker, aggregation))
+    return RING_BUFFERS[key]
+
+
+
+def update_ring_buffer(ticker, aggregation, chain_data):
+    """Ajoute le snapshot au ring buffer et retourne les vol triggers locaux"""
+    ring = get_ring_buffer(ticker, aggregation)
+    if ring.push(chain_data.get('timestamp', 0), chain_data.get('strikes', [])):
+        os.makedirs(STATE_DIR, exist_ok=True)
+        ring.save(ring_buffer_path(ticker, aggregation))
+    return ring.vol_triggers(VOL_TRIGGER_WINDOWS)
+
+
+
+def record_snapshot(ticker, aggregation, chain_data):
+    """Archive la chaîne dans l'historique compact du jour (HISTORY_DIR)"""
+    day = datetime.fromtimestamp(chain_data.get('timestamp', 0), timezone.utc).strftime('%Y%m%d')
+    path = os.path.join(HISTORY_DIR, f"{ticker.lower()}_{aggregation}_{day}.gexs")
+    writer = SNAPSHOT_WRITERS.get((ticker, aggregation))
+    if writer is None or writer.path != path:
+        os.makedirs(HISTORY_DIR, exist_ok=True)
+        writer = SNAPSHOT_WRITERS[(ticker, aggregation)] = SnapshotWriter(path)
+    try:
+        writer.append(chain_data)
+    except Exception as e:
+        log(f"⚠️  Historique {ticker}/{aggregation}: {e}")
+
+
+
+def update_heatmap(ticker, aggregation, chain_data):
+    """Ajoute une ligne à la heatmap strike × temps de la session (HEATMAP_DIR)"""
+    day = datetime.fromtimestamp(chain_data.get('timestamp', 0), timezone.utc).strftime('%Y%m%d')
+    path = heatmap_path(HEATMAP_DIR, ticker, aggregation, day)
+    heatmap = HEATMAPS.get((ticker, aggregation))
+    try:
+        if heatmap is None or heatmap.path != path:
+            if os.path.exists(path):
+                heatmap = GexHeatmap(path, mode='w')
+            else:
+                strikes = [s[0] for s in chain_data.get('strikes', []) if isinstance(s, list) and s]
+                heatmap = GexHeatmap.create(path, strikes, chain_data.get('spot', 0))
+            HEATMAPS[(ticker, aggregation)] = heatmap
+        heatmap.append(chain_data.get('timestamp', 0), chain_data.get('strikes', []))
+    except Exception as e:
+        log(f"⚠️  Heatmap {ticker}/{aggregation}: {e}")
+
+
+
 def calculate_advanced_levels(strikes, spot):
     call_resistance_total = 0
     put_support_total = 0
@@ -105,7 +192,7 @@ def calculate_advanced_levels(strikes, spot):
 
 
 
-def generate_levels(source_ticker, chain_data, majors_data, dte_api_name, dte_label):
+def generate_levels(source_ticker, chain_data, majors_data, dte_api_name, dte_label, vol_triggers=None):
     if not chain_data or not chain_data.get('strikes'):
         return None, None
     
@@ -136,7 +223,12 @@ def generate_levels(source_ticker, chain_data, majors_data, dte_api_name, dte_la
     dte_display = f"0DTE" if is_zero_dte else f"{front_expiry_dte}DTE"
     
     log(f"   📊 {target}/{dte_label} - Spot: {spot_price}, {dte_display}")
-    log(f"      Zero Gamma: {volatility_trigger}")
+    analytics = analyze_strikes(strike_gex_curve, spot_price)
+    zero_gamma_source = 'api'
+    if not volatility_trigger and analytics['zero_gamma']:
+        volatility_trigger = analytics['zero_gamma']
+        zero_gamma_source = 'local'
+    log(f"      Zero Gamma: {volatility_trigger} ({zero_gamma_source})")
     advanced = calculate_advanced_levels(strike_gex_curve, spot_price)
     log(f"      CallResAll: {advanced['call_res_all']:.0f} GEX")
     log(f"      PutSupAll: {advanced['put_sup_all']:.0f} GEX")
@@ -145,14 +237,14 @@ def generate_levels(source_ticker, chain_data, majors_data, dte_api_name, dte_la
     
     # IMPORTANCE 10 - Volatility Trigger (Zero Gamma)
     if volatility_trigger and volatility_trigger != 0:
-        regime = "Negative Gamma" if spot_price > volatility_trigger else "Positive Gamma"
+        regime = regime_label(gamma_regime(spot_price, volatility_trigger))
         levels.append({
             'strike': round(volatility_trigger, 2), 
             'importance': 10, 
             'type': 'zero_gamma', 
             'label': 'Zero Gamma', 
             'dte': dte_display, 
-            'description': f"Vol trigger - {regime}"
+            'description': f"Vol trigger - {regime}" + (" (local)" if zero_gamma_source == 'local' else "")
         })
     
     # IMPORTANCE 10 - Major Walls (les vrais majors)
@@ -300,43 +392,41 @@ def generate_levels(source_ticker, chain_data, majors_data, dte_api_name, dte_la
             'description': f"{strike_desc} - {s['total_gex']:.0f} GEX"
         })
     
-    # IMPORTANCE 7-9 - Vol Triggers
-    if vol_triggers_timeframe and isinstance(vol_triggers_timeframe, list):
-        intervals = ['1min', '5min', '10min', '15min', '30min', '1h']
-        for idx, strike_array in enumerate(vol_triggers_timeframe[:6]):
-            if isinstance(strike_array, list) and len(strike_array) >= 2:
-                strike_val = strike_array[0]
-                gex_change = strike_array[1]
-                intensity = abs(gex_change)
-                if strike_val and strike_val != 0 and intensity > 50:
-                    interval_name = intervals[idx] if idx < len(intervals) else f'interval{idx}'
-                    if intensity > 5000:
-                        importance, label = 9, f"Vol Trigger ({interval_name})"
-                    elif intensity > 2000:
-                        importance, label = 8, f"Vol Trigger ({interval_name})"
-                    else:
-                        importance, label = 7, f"Vol Trigger ({interval_name})"
-                    levels.append({
-                        'strike': round(strike_val, 2), 
-                        'importance': importance, 
-                        'type': 'vol_trigger', 
-                        'label': label, 
-                        'dte': dte_display, 
-                        'description': f"Vol trigger - GEX Δ {gex_change:+.0f} ({interval_name})"
-                    })
+    # IMPORTANCE 7-9 - Vol Triggers (ring buffer local, sinon max_priors de l'API fenêtre par fenêtre :
+    # une fenêtre que le ring buffer ne couvre pas encore reprend la valeur API à la même position)
+    local_triggers = dict(vol_triggers or [])
+    api_triggers = vol_triggers_timeframe if isinstance(vol_triggers_timeframe, list) else []
+    vol_triggers = []
+    for idx, interval_name in enumerate(MAX_PRIORS_INTERVALS):
+        if interval_name in local_triggers:
+            vol_triggers.append((interval_name, local_triggers.pop(interval_name)))
+        elif idx < len(api_triggers):
+            vol_triggers.append((interval_name, api_triggers[idx]))
+    vol_triggers.extend(local_triggers.items())
+    
+    for interval_name, strike_array in vol_triggers:
+        if isinstance(strike_array, list) and len(strike_array) >= 2:
+            strike_val = strike_array[0]
+            gex_change = strike_array[1]
+            intensity = abs(gex_change)
+            if strike_val and strike_val != 0 and intensity > 50:
+                if intensity > 5000:
+                    importance, label = 9, f"Vol Trigger ({interval_name})"
+                elif intensity > 2000:
+                    importance, label = 8, f"Vol Trigger ({interval_name})"
+                else:
+                    importance, label = 7, f"Vol Trigger ({interval_name})"
+                levels.append({
+                    'strike': round(strike_val, 2), 
+                    'importance': importance, 
+                    'type': 'vol_trigger', 
+                    'label': label, 
+                    'dte': dte_display, 
+                    'description': f"Vol trigger - GEX Δ {gex_change:+.0f} ({interval_name})"
+                })
     
     # IMPORTANCE 8 - Max Pain
-    min_gex = float('inf')
-    max_pain = None
-    for strike_array in strike_gex_curve:
-        if isinstance(strike_array, list) and len(strike_array) >= 3:
-            strike_price_val = strike_array[0]
-            gex_vol = strike_array[1]
-            gex_oi = strike_array[2]
-            total_gex = abs(gex_vol + gex_oi)
-            if total_gex < min_gex:
-                min_gex = total_gex
-                max_pain = strike_price_val
+    max_pain = analytics['max_pain']
     
     if max_pain:
         levels.append({
@@ -360,12 +450,16 @@ def generate_levels(source_ticker, chain_data, majors_data, dte_api_name, dte_la
         'net_gex_volume': net_gex_volume,
         'net_gex_oi': net_gex_oi,
         'call_res_all': advanced['call_res_all'],
-        'put_sup_all': advanced['put_sup_all']
+        'put_sup_all': advanced['put_sup_all'],
+        'zero_gamma_source': zero_gamma_source,
+        'zero_crossings': analytics['zero_crossings'],
+        'gamma_profile': analytics['gamma_profile']
     }
     
     if not df.empty:
         df = df.drop_duplicates(subset=['strike'], keep='first')
-        df = df.sort_values('importance', ascending=False)
+        # Tri stable : à importance égale l'ordre de génération (GEX décroissant) est conservé
+        df = df.sort_values('importance', ascending=False, kind='stable')
         log(f"      ✅ {len(df)} niveaux générés")
         return df, metadata
     return None, None
@@ -391,13 +485,43 @@ def metadata_to_pinescript_string(metadata_dict):
     meta_str += f"NetGEXVol:{metadata_dict.get('net_gex_volume', 0):.2f}|"
     meta_str += f"NetGEXOI:{metadata_dict.get('net_gex_oi', 0):.2f}|"
     meta_str += f"CallResAll:{metadata_dict.get('call_res_all', 0):.2f}|"
-    meta_str += f"PutSupAll:{metadata_dict.get('put_sup_all', 0):.2f}"
+    meta_str += f"PutSupAll:{metadata_dict.get('put_sup_all', 0):.2f}|"
+    meta_str += f"Persistence:{metadata_dict.get('persistence_avg', 0):.2f}"
     return meta_str
 
 
 
-def generate_pinescript_indicator(csv_data_dict, metadata_dict):
-    """Génère le fichier Pine Script avec multiplicateurs FIXES et affichage des métadonnées"""
+def profile_to_pinescript_string(gamma_profile):
+    """Convertit le profil gamma en string 'strike:gex;...' pour Pine Script"""
+    return ";".join(f"{strike:.2f}:{gex:.0f}" for strike, gex in gamma_profile)
+
+
+
+def generate_pinescript_indicator(level_sets, budget=None):
+    """
+    Génère le Pine Script sous budget (lignes, labels, octets par string, taille du script).
+    Retourne (script, rapport) ; le rapport liste les niveaux écartés par série.
+    """
+    budget = dict(budget or PINE_BUDGET)
+    budget['reserved_lines'] = GAMMA_PROFILE_POINTS
+    
+    meta_strs = {k: metadata_to_pinescript_string(meta) for k, (_, meta) in level_sets.items()}
+    profile_strs = {k: profile_to_pinescript_string(meta.get('gamma_profile', [])) for k, (_, meta) in level_sets.items()}
+    # +16 : marge pour les compteurs du commentaire "Budget" rendus après la sélection
+    fixed_bytes = len(render_pinescript({}, meta_strs, profile_strs, budget).encode('utf-8')) + 16
+    
+    selected_sets, report = fit_to_budget(level_sets, budget, fixed_bytes)
+    csv_strs = {k: csv_to_pinescript_string(df.to_csv(index=False)) for k, (df, _) in selected_sets.items()}
+    pine_script = render_pinescript(csv_strs, meta_strs, profile_strs, budget, report)
+    report['script_bytes'] = len(pine_script.encode('utf-8'))
+    return pine_script, report
+
+
+
+def render_pinescript(csv_data_dict, metadata_dict, profile_dict, budget, report=None):
+    """Template Pine Script avec multiplicateurs FIXES et affichage des métadonnées"""
+    dropped_count = sum(len(v) for v in report['dropped'].values()) if report else 0
+    kept_count = report['kept'] if report else 0
     
     es_zero_str = csv_data_dict.get('es_zero', '')
     es_one_str = csv_data_dict.get('es_one', '')
@@ -413,11 +537,19 @@ def generate_pinescript_indicator(csv_data_dict, metadata_dict):
     nq_one_meta = metadata_dict.get('nq_one', '')
     nq_full_meta = metadata_dict.get('nq_full', '')
     
+    es_zero_profile = profile_dict.get('es_zero', '')
+    es_one_profile = profile_dict.get('es_one', '')
+    es_full_profile = profile_dict.get('es_full', '')
+    nq_zero_profile = profile_dict.get('nq_zero', '')
+    nq_one_profile = profile_dict.get('nq_one', '')
+    nq_full_profile = profile_dict.get('nq_full', '')
+    
     spx_multiplier = TICKERS['SPX']['multiplier']
     ndx_multiplier = TICKERS['NDX']['multiplier']
     
     pine_script = f'''//@version=6
-indicator("GEX Professional Levels", overlay=true, max_lines_count=500, max_labels_count=500)
+indicator("GEX Professional Levels", overlay=true, max_lines_count={budget['max_lines']}, max_labels_count={budget['max_labels']})
+// Budget: {kept_count} niveaux inclus, {dropped_count} écartés
 
 
 
@@ -441,6 +573,16 @@ string nq_meta_full = "{nq_full_meta}"
 
 
 
+// ==================== GAMMA PROFILE ====================
+string es_profile_zero = "{es_zero_profile}"
+string es_profile_one = "{es_one_profile}"
+string es_profile_full = "{es_full_profile}"
+string nq_profile_zero = "{nq_zero_profile}"
+string nq_profile_one = "{nq_one_profile}"
+string nq_profile_full = "{nq_full_profile}"
+
+
+
 // ==================== AUTO-DETECTION TICKER ====================
 string detected_ticker = "ES"
 if str.contains(syminfo.ticker, "NQ") or str.contains(syminfo.ticker, "NDX") or str.contains(syminfo.ticker, "NAS")
@@ -519,6 +661,21 @@ float label_min_distance_pct = input.float(0.3, "Min Distance from Price (%)", m
 
 
 
+// ==================== PERSISTANCE ====================
+bool fade_transient = input.bool(true, "Fade Transient Levels", group="⏳ Persistence", tooltip="Levels that just appeared are drawn more transparent")
+int transient_fade_max = input.int(70, "Max Fade (transparency)", minval=0, maxval=100, group="⏳ Persistence")
+
+
+
+// ==================== GAMMA PROFILE DISPLAY ====================
+bool show_gamma_profile = input.bool(false, "Show Gamma Profile", group="📈 Gamma Profile", tooltip="Net GEX by strike bucket, drawn right of the last bar")
+int profile_width = input.int(30, "Profile Width (bars)", minval=5, maxval=200, group="📈 Gamma Profile")
+int profile_offset = input.int(5, "Profile Offset (bars)", minval=0, maxval=100, group="📈 Gamma Profile")
+color color_profile_pos = input.color(color.new(color.teal, 40), "Positive GEX", group="📈 Gamma Profile", inline="p1")
+color color_profile_neg = input.color(color.new(color.maroon, 40), "Negative GEX", group="📈 Gamma Profile", inline="p1")
+
+
+
 // ==================== METADATA DISPLAY ====================
 bool show_metadata = input.bool(false, "Show Market Info Table", group="📊 Metadata", tooltip="Display GEX metadata table (separate from chart)")
 
@@ -623,9 +780,12 @@ process_csv(string csv_data) =>
                                 string level_type = array.get(fields, 2)
                                 string label_text = array.get(fields, 3)
                                 string description = num_fields >= 6 ? array.get(fields, 5) : ""
+                                float persistence = num_fields >= 8 ? str.tonumber(array.get(fields, 7)) : na
                                 
                                 if should_show_level(importance, level_type)
                                     color level_color = get_level_color(level_type)
+                                    if fade_transient and not na(persistence)
+                                        level_color := color.new(level_color, math.round(transient_fade_max * (1 - persistence)))
                                     line new_line = line.new(x1=bar_index[500], y1=strike_price, x2=bar_index, y2=strike_price, color=level_color, width=1, style=line.style_solid, extend=extend.right)
                                     array.push(all_lines, new_line)
                                     
@@ -646,27 +806,57 @@ process_csv(string csv_data) =>
 
 
 
+process_profile(string profile_data) =>
+    if bar_index == last_bar_index and str.length(profile_data) > 0
+        points = str.split(profile_data, ";")
+        float max_abs = 0.0
+        for point in points
+            kv = str.split(point, ":")
+            if array.size(kv) == 2
+                float gex = str.tonumber(array.get(kv, 1))
+                if not na(gex)
+                    max_abs := math.max(max_abs, math.abs(gex))
+        if max_abs > 0
+            for point in points
+                kv = str.split(point, ":")
+                if array.size(kv) == 2
+                    float strike_raw = str.tonumber(array.get(kv, 0))
+                    float gex = str.tonumber(array.get(kv, 1))
+                    if not na(strike_raw) and not na(gex)
+                        float strike_price = needs_conversion ? strike_raw * conversion_multiplier : strike_raw
+                        int length = math.max(1, math.round(profile_width * math.abs(gex) / max_abs))
+                        line bar = line.new(x1=bar_index + profile_offset, y1=strike_price, x2=bar_index + profile_offset + length, y2=strike_price, color=gex >= 0 ? color_profile_pos : color_profile_neg, width=3)
+                        array.push(all_lines, bar)
+
+
+
 // ==================== EXÉCUTION ====================
 if barstate.islast
     clear_all_objects()
     
     string csv_active = ""
     string meta_active = ""
+    string profile_active = ""
     
     if detected_ticker == "ES"
         csv_active := selected_dte == "0DTE" ? es_csv_zero : selected_dte == "1DTE" ? es_csv_one : es_csv_full
         meta_active := selected_dte == "0DTE" ? es_meta_zero : selected_dte == "1DTE" ? es_meta_one : es_meta_full
+        profile_active := selected_dte == "0DTE" ? es_profile_zero : selected_dte == "1DTE" ? es_profile_one : es_profile_full
     else
         csv_active := selected_dte == "0DTE" ? nq_csv_zero : selected_dte == "1DTE" ? nq_csv_one : nq_csv_full
         meta_active := selected_dte == "0DTE" ? nq_meta_zero : selected_dte == "1DTE" ? nq_meta_one : nq_meta_full
+        profile_active := selected_dte == "0DTE" ? nq_profile_zero : selected_dte == "1DTE" ? nq_profile_one : nq_profile_full
     
     process_csv(csv_active)
     
+    if show_gamma_profile
+        process_profile(profile_active)
+    
     // Afficher la table de métadonnées
     if show_metadata and str.length(meta_active) > 0
-        var table meta_tbl = table.new(position.top_right, 2, 11, bgcolor=color.new(color.gray, 85), border_width=1, border_color=color.new(color.white, 50))
+        var table meta_tbl = table.new(position.top_right, 2, 12, bgcolor=color.new(color.gray, 85), border_width=1, border_color=color.new(color.white, 50))
         
-        table.clear(meta_tbl, 0, 0, 1, 10)
+        table.clear(meta_tbl, 0, 0, 1, 11)
         
         parts = str.split(meta_active, "|")
         table.cell(meta_tbl, 0, 0, "GEX Metadata", text_color=color.white, text_size=size.small, bgcolor=color.new(color.blue, 70))
@@ -742,9 +932,376 @@ plot(close, title="Price", display=display.none)
 
 
 
-def main():
-    timestamp = datetime.now(timezone.utc)
-    timestamp_str = timestamp.strftime('%Y-%m-%d %H:%M:%S UTC')
+def levels_to_json(level_sets, generated_at):
+    """Sortie JSON de tous les sets de niveaux (pour le frontend et les outils locaux)"""
+    payload = {'generated_at': generated_at, 'levels': {}}
+    for csv_key, (df_levels, metadata) in level_sets.items():
+        payload['levels'][csv_key] = {
+            'metadata': metadata,
+            'levels': df_levels.to_dict(orient='records')
+        }
+    return json.dumps(payload, default=float)
+
+
+
+def publish_live_table(level_sets):
+    live_table = LiveLevelTable(mode='w')
+    try:
+        for csv_key, (df_levels, metadata) in level_sets.items():
+            live_table.publish(csv_key, df_levels, metadata)
+    finally:
+        live_table.close()
+
+
+
+def append_level_history(level_sets):
+    for csv_key, (df_levels, metadata) in level_sets.items():
+        append_levels(csv_key, df_levels, metadata)
+
+
+
+def update_rollups(level_sets):
+    for csv_key, (df_levels, metadata) in level_sets.items():
+        append_rollups(csv_key, df_levels, metadata)
+
+
+
+def csv_output_file(csv_key):
+    return csv_key.replace('_', '_gex_', 1) + '.csv'
+
+
+
+def render_pine(level_sets):
+    pine_script, report = generate_pinescript_indicator(level_sets)
+    for key, dropped in report['dropped'].items():
+        log(f"   ✂️  Pine {key}: {len(dropped)} niveaux écartés (budget)")
+    return pine_script
+
+
+
+def build_output_sinks(rendered, generated_at):
+    """
+    Étape write : sorties déjà rendues par les noeuds render:<kind> du pipeline.
+    rendered = {kind: rendu} ; un rendu None (séries manquantes) ne produit pas de sortie.
+    """
+    sinks = {}
+    
+    def write_bundle():
+        """publish_bundle écrit lui-même ses fichiers : rien à écrire pour run_sinks"""
+        level_sets, pine_script = rendered['bundle']
+        publish_bundle(level_sets, pine_script, generated_at)
+    
+    if rendered.get('csv'):
+        for output_file, content in rendered['csv'].items():
+            sinks[output_file] = (output_file, lambda content=content: content)
+    if rendered.get('pine') is not None:
+        sinks['pine'] = (PINE_OUTPUT_FILE, lambda: rendered['pine'])
+    if rendered.get('json') is not None:
+        sinks['json'] = (JSON_OUTPUT_FILE, lambda: rendered['json'])
+    if rendered.get('bundle') is not None:
+        sinks['bundle'] = (None, write_bundle)
+    if rendered.get('history'):
+        sinks['history'] = (None, lambda: append_level_history(rendered['history']))
+    if rendered.get('rollups'):
+        sinks['rollups'] = (None, lambda: update_rollups(rendered['rollups']))
+    if rendered.get('live'):
+        sinks['live_table'] = (None, lambda: publish_live_table(rendered['live']))
+    return sinks
+
+
+
+def level_cache_path(csv_key):
+    return os.path.join(LEVEL_CACHE_DIR, f"{csv_key}.json")
+
+
+
+def save_cached_levels(csv_key, df_levels, metadata):
+    payload = {'metadata': metadata, 'levels': df_levels.to_dict(orient='records')}
+    atomic_write(level_cache_path(csv_key), json.dumps(payload, default=float))
+
+
+
+def load_cached_levels(csv_key):
+    """Dernier set de niveaux calculé pour la série, None si absent"""
+    path = level_cache_path(csv_key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        return pd.DataFrame(payload['levels']), payload['metadata']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+
+def series_csv_key(source_ticker, dte_api_name):
+    return f"{TICKERS[source_ticker]['target'].lower()}_{dte_api_name}"
+
+
+
+def compute_series(source_ticker, dte_api_name, fetched, scorer, scheduler=None):
+    """Noeud compute : historique, ring buffer, niveaux et persistance d'une série"""
+    chain_data, majors_data = fetched
+    target = TICKERS[source_ticker]['target']
+    dte_label = DTE_PERIODS[dte_api_name]
+    log(f"\n📊 {source_ticker} -> {target} 🔹 {dte_label}")
+    result = None
+    df_levels = None
+    
+    if chain_data and chain_data.get('strikes'):
+        record_snapshot(source_ticker, dte_api_name, chain_data)
+        update_heatmap(source_ticker, dte_api_name, chain_data)
+        local_triggers = update_ring_buffer(source_ticker, dte_api_name, chain_data)
+        df_levels, metadata = generate_levels(source_ticker, chain_data, majors_data, dte_api_name, dte_label, local_triggers)
+        
+        if df_levels is not None and not df_levels.empty and metadata:
+            csv_key = series_csv_key(source_ticker, dte_api_name)
+            scorer.update(csv_key, df_levels, chain_data)
+            metadata['persistence_avg'] = float(df_levels['persistence'].mean())
+            save_cached_levels(csv_key, df_levels, metadata)
+            result = (df_levels, metadata)
+    
+    if scheduler:
+        state = scheduler.observe(source_ticker, dte_api_name, chain_data, df_levels)
+        log(f"      ⏱️  Prochain refresh dans {state['interval']:.0f}s (cadence {state['cadence']:.0f}s)")
+    return result
+
+
+
+def load_csv_levels(csv_key):
+    """
+    Dernier recours pour une série jamais calculée par le pipeline (cache vide) :
+    le CSV publié sur disque, avec les métadonnées du dernier JSON si elles existent
+    """
+    output_file = csv_output_file(csv_key)
+    if not os.path.exists(output_file):
+        return None
+    try:
+        df_levels = pd.read_csv(output_file)
+    except (OSError, ValueError):
+        return None
+    metadata = {}
+    if os.path.exists(JSON_OUTPUT_FILE):
+        try:
+            with open(JSON_OUTPUT_FILE, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)['levels'][csv_key]['metadata']
+        except (OSError, ValueError, KeyError):
+            metadata = {}
+    return df_levels, metadata
+
+
+
+def load_previous_levels(csv_key, memory):
+    """Niveaux d'une série non demandée : mémoire (watch), cache state/levels, puis CSV publié"""
+    return memory.get(csv_key) or load_cached_levels(csv_key) or load_csv_levels(csv_key)
+
+
+
+def select_sets(keys, sets, complete):
+    """
+    Noeud output:<kind> : sets de niveaux disponibles pour une sortie.
+    complete=True (Pine, JSON, bundle) : None si une série manque, pour ne jamais publier une sortie amputée.
+    """
+    selected = {k: s for k, s in zip(keys, sets) if s}
+    if complete and len(selected) < len(keys):
+        missing = [k for k in keys if k not in selected]
+        log(f"   ⚠️  Sortie partagée ignorée, séries sans niveaux: {', '.join(missing)}")
+        return None
+    return selected
+
+
+
+def render_csv(level_sets):
+    return {csv_output_file(k): df.to_csv(index=False) for k, (df, _) in level_sets.items()}
+
+
+
+def build_pipeline(requested, planner, scorer, scheduler=None, memory=None, generated_at=None):
+    """
+    Graphe fetch:<série> → levels:<série> → output:<kind> → render:<kind> ; l'étape write (run_sinks) consomme les rendus.
+    Les séries non demandées ne sont pas fetchées : leur noeud levels relit le dernier résultat (mémoire, cache ou CSV).
+    """
+    pipeline = Pipeline()
+    memory = memory or {}
+    generated_at = generated_at or utc_now_str()
+    all_keys = []
+    
+    for source_ticker in TICKERS:
+        for dte_api_name in DTE_PERIODS:
+            csv_key = series_csv_key(source_ticker, dte_api_name)
+            all_keys.append(csv_key)
+            if (source_ticker, dte_api_name) in requested:
+                pipeline.add(f"fetch:{csv_key}",
+                             lambda t=source_ticker, a=dte_api_name: planner.fetch(t, a, fetch_gex_data, fetch_gex_majors))
+                pipeline.add(f"levels:{csv_key}",
+                             lambda fetched, t=source_ticker, a=dte_api_name: compute_series(t, a, fetched, scorer, scheduler),
+                             [f"fetch:{csv_key}"])
+            else:
+                pipeline.add(f"levels:{csv_key}", lambda k=csv_key: load_previous_levels(k, memory))
+    
+    fresh_keys = [series_csv_key(t, a) for t, a in prioritize(requested)]
+    for kind in OUTPUT_KINDS:
+        fresh_only = kind in FRESH_ONLY_OUTPUTS
+        keys = fresh_keys if fresh_only else fresh_keys + [k for k in all_keys if k not in fresh_keys]
+        pipeline.add(f"output:{kind}",
+                     lambda *sets, keys=tuple(keys), complete=not fresh_only: select_sets(keys, sets, complete),
+                     [f"levels:{k}" for k in keys])
+    
+    def skip_missing(render):
+        return lambda sets: None if sets is None else render(sets)
+    
+    pipeline.add('render:csv', render_csv, ['output:csv'])
+    pipeline.add('render:pine', skip_missing(render_pine), ['output:pine'])
+    pipeline.add('render:json', skip_missing(lambda sets: levels_to_json(sets, generated_at)), ['output:json'])
+    pipeline.add('render:bundle', lambda sets, pine: None if sets is None or pine is None else (sets, pine),
+                 ['output:bundle', 'render:pine'])
+    for kind in ('history', 'rollups', 'live'):
+        # Sorties à effet de bord (journal, agrégats, table mmap) : rien à rendre, les sets passent tels quels
+        pipeline.add(f"render:{kind}", lambda sets: sets, [f"output:{kind}"])
+    return pipeline, fresh_keys
+
+
+
+def run_targets(requested, outputs, planner, scorer, level_sets, timestamp_str, scheduler=None):
+    """Exécute uniquement les noeuds nécessaires aux sorties demandées, puis l'étape write"""
+    pipeline, fresh_keys = build_pipeline(requested, planner, scorer, scheduler, level_sets, timestamp_str)
+    targets = [f"levels:{k}" for k in fresh_keys] + [f"render:{kind}" for kind in outputs]
+    results = pipeline.evaluate(targets)
+    
+    for kind in outputs:
+        level_sets.update(pipeline.results[f"output:{kind}"] or {})
+    fresh_keys = [k for k in fresh_keys if results[f"levels:{k}"]]
+    
+    stats = planner.stats
+    log(f"\n📡 {stats['calls']} appels API, {stats['majors_skipped']} /majors évités, {stats['waited']:.1f}s d'attente quota")
+    scorer.save()
+    return write_outputs({kind: results[f"render:{kind}"] for kind in outputs}, timestamp_str, fresh_keys)
+
+
+
+def csv_generated_at(path, outputs):
+    """Date de génération d'un CSV : entrée du manifest, sinon mtime du fichier, sinon None"""
+    if path in outputs:
+        return outputs[path]['generated_at']
+    if os.path.exists(path):
+        return datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+    return None
+
+
+
+def write_outputs(rendered, timestamp_str, fresh_keys=None):
+    """Étape write ; retourne le nombre de CSV écrits"""
+    sinks = build_output_sinks(rendered, timestamp_str)
+    if not sinks:
+        return 0
+    results = run_sinks(sinks)
+    for name, result in results.items():
+        if result['status'] == 'ok':
+            log(f"   💾 {name}")
+        else:
+            log(f"   ❌ {name}: {result['error']}")
+    total_files = sum(1 for name, r in results.items() if name.endswith('.csv') and r['status'] == 'ok')
+    
+    # last_update = date du CSV le plus ancien présent : un run partiel ne rend pas les autres séries plus fraîches.
+    # Un CSV absent du manifest (arbre neuf, manifest perdu) est daté par son mtime, une série jamais écrite est ignorée.
+    # Écrit avant le manifest et listé dedans : le manifest reste le dernier fichier validé du run
+    outputs_so_far = merge_manifest(results, timestamp_str, fresh_keys)['outputs']
+    stamps = [csv_generated_at(csv_output_file(series_csv_key(t, a)), outputs_so_far)
+              for t in TICKERS for a in DTE_PERIODS]
+    stamps = [s for s in stamps if s]
+    if total_files > 0 and stamps:
+        stamp = min(stamps)
+        results['last_update'] = {'status': 'ok', 'path': TIMESTAMP_OUTPUT_FILE, 'stamp': stamp,
+                                  'sha256': atomic_write(TIMESTAMP_OUTPUT_FILE, stamp)}
+    write_manifest(results, timestamp_str, fresh_keys)
+    return total_files
+
+
+
+def utc_now_str():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mise à jour des niveaux GEX (CSV, Pine Script, bundle...)")
+    parser.add_argument('--tickers', default=','.join(TICKERS),
+                        help="Tickers à rafraîchir, source ou cible (ex: ES,NQ ou SPX)")
+    parser.add_argument('--dte', default=','.join(DTE_PERIODS),
+                        help="Agrégations à rafraîchir (zero,one,full)")
+    parser.add_argument('--outputs', default=','.join(OUTPUT_KINDS),
+                        help=f"Sorties à produire ({','.join(OUTPUT_KINDS)})")
+    parser.add_argument('--watch', action='store_true',
+                        help="Process résident avec cadence adaptative par série")
+    args = parser.parse_args(argv)
+    
+    by_target = {config['target']: source for source, config in TICKERS.items()}
+    tickers = []
+    for name in args.tickers.upper().split(','):
+        source = name if name in TICKERS else by_target.get(name)
+        if not source:
+            parser.error(f"ticker inconnu: {name}")
+        tickers.append(source)
+    
+    dtes = [d.strip().lower() for d in args.dte.split(',')]
+    outputs = [o.strip().lower() for o in args.outputs.split(',')]
+    for dte in dtes:
+        if dte not in DTE_PERIODS:
+            parser.error(f"DTE inconnu: {dte}")
+    for output in outputs:
+        if output not in OUTPUT_KINDS:
+            parser.error(f"sortie inconnue: {output}")
+    
+    args.series = [(t, d) for t in dict.fromkeys(tickers) for d in dict.fromkeys(dtes)]
+    args.outputs = list(dict.fromkeys(outputs))
+    return args
+
+
+
+def watch(series, outputs):
+    """Process résident : ne rafraîchit que les séries dues selon leur cadence adaptative"""
+    log("=" * 70)
+    log(f"👀 GEX PROFESSIONAL LEVELS - WATCH MODE - {utc_now_str()}")
+    log("=" * 70)
+    
+    if not API_KEY:
+        log("❌ ERREUR: GEXBOT_API_KEY non définie")
+        sys.exit(1)
+    
+    level_sets = {}
+    scorer = PersistenceScorer.load()
+    scheduler = RefreshScheduler.load()
+    planner = RequestPlanner()
+    due = series
+    
+    try:
+        while True:
+            try:
+                run_targets(due, outputs, planner, scorer, level_sets, utc_now_str(), scheduler)
+            except Exception as e:
+                log(f"❌ Refresh {', '.join(f'{t}/{d}' for t, d in due)} en échec: {e}")
+                # Séries restées dues (non observées avant l'erreur) : nouvel essai plus tard
+                for ticker, aggregation in scheduler.due(due):
+                    scheduler.defer(ticker, aggregation)
+            scheduler.save()
+            
+            while True:
+                delay = min(REFRESH_MAX_INTERVAL, max(1.0, scheduler.next_wakeup(series) - time.time()))
+                time.sleep(delay)
+                due = scheduler.due(series)
+                if due:
+                    break
+    except KeyboardInterrupt:
+        scheduler.save()
+        log("🛑 Watch mode arrêté")
+
+
+
+def main(series=None, outputs=None):
+    timestamp_str = utc_now_str()
+    series = series or [(ticker, dte) for ticker in TICKERS for dte in DTE_PERIODS]
+    outputs = outputs or OUTPUT_KINDS
     
     log("=" * 70)
     log(f"🚀 GEX PROFESSIONAL LEVELS - {timestamp_str}")
@@ -757,62 +1314,25 @@ def main():
     log("\n🔢 Multiplicateurs configurés:")
     log(f"   SPX -> ES: {TICKERS['SPX']['multiplier']}")
     log(f"   NDX -> NQ: {TICKERS['NDX']['multiplier']}")
+    log(f"   🎯 Séries: {', '.join(f'{t}/{d}' for t, d in series)} | Sorties: {','.join(outputs)}")
     
-    os.makedirs('indicator', exist_ok=True)
-    
-    total_files = 0
-    csv_data_dict = {}
-    metadata_dict = {}
-    
-    for source_ticker, config in TICKERS.items():
-        target = config['target']
-        log(f"\n📊 Processing {source_ticker} -> {target}")
-        
-        for dte_api_name, dte_label in DTE_PERIODS.items():
-            log(f"\n   🔹 {dte_label}")
-            chain_data = fetch_gex_data(source_ticker, dte_api_name)
-            majors_data = fetch_gex_majors(source_ticker, dte_api_name)
-            
-            if chain_data and chain_data.get('strikes'):
-                df_levels, metadata = generate_levels(source_ticker, chain_data, majors_data, dte_api_name, dte_label)
-                
-                if df_levels is not None and not df_levels.empty and metadata:
-                    output_file = f"{target.lower()}_gex_{dte_api_name}.csv"
-                    df_levels.to_csv(output_file, index=False)
-                    
-                    csv_content = df_levels.to_csv(index=False)
-                    csv_key = f"{target.lower()}_{dte_api_name}"
-                    csv_data_dict[csv_key] = csv_to_pinescript_string(csv_content)
-                    metadata_dict[csv_key] = metadata_to_pinescript_string(metadata)
-                    
-                    log(f"      💾 {output_file} ({len(df_levels)} niveaux)")
-                    total_files += 1
-    
-    if csv_data_dict:
-        pinescript_indicator = generate_pinescript_indicator(csv_data_dict, metadata_dict)
-        indicator_file = 'indicator/gex-levels.pine'
-        
-        with open(indicator_file, 'w', encoding='utf-8') as f:
-            f.write(pinescript_indicator)
-        
-        log(f"\n📊 Pine Script généré: {indicator_file}")
-    
-    if total_files > 0:
-        with open('last_update.txt', 'w') as f:
-            f.write(timestamp_str)
-            f.flush()
+    total_files = run_targets(series, outputs, RequestPlanner(), PersistenceScorer.load(), {}, timestamp_str)
     
     log("\n" + "=" * 70)
     log(f"✅ COMPLETED - {total_files} CSV + 1 Pine Script générés")
     log("=" * 70)
     
-    sys.exit(0 if total_files > 0 else 1)
+    sys.exit(0 if total_files > 0 or 'csv' not in outputs else 1)
 
 
 
 if __name__ == '__main__':
     try:
-        main()
+        args = parse_args()
+        if args.watch:
+            watch(args.series, args.outputs)
+        else:
+            main(args.series, args.outputs)
     except Exception as e:
         log(f"❌ CRITICAL ERROR: {e}")
         import traceback